@@ -6,8 +6,16 @@
 #              Don't modify the contents of this file.
 
 
+import os
+import struct
+from bisect import bisect_left
+from collections.abc import ItemsView, ValuesView
+from itertools import islice
+
+
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
+
 class DynamicArrayException(Exception):
     pass
 
@@ -16,26 +24,21 @@ class DynamicArray:
     """
     Class implementing a Dynamic Array
     Supported methods are:
-    append, pop, swap, get_at_index, set_at_index, length
+    append, extend, pop, swap, get_at_index, set_at_index, length, iterator
     """
 
+    __slots__ = ('_data',)
+
     def __init__(self, arr=None) -> None:
         """Initialize new dynamic array using a list."""
         self._data = arr.copy() if arr else []
 
     def __iter__(self):
         """
-        Disable iterator capability for DynamicArray class
-        This means loops and aggregate functions like
-        those shown below won't work:
-
-        da = DynamicArray()
-        for value in da:        # will not work
-        min(da)                 # will not work
-        max(da)                 # will not work
-        sort(da)                # will not work
+        Return an iterator over the elements in index order, which skips
+        the bounds check get_at_index does for every index.
         """
-        return None
+        return iter(self._data)
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -45,6 +48,10 @@ class DynamicArray:
         """Add new element at the end of the array."""
         self._data.append(value)
 
+    def extend(self, values) -> None:
+        """Add the elements of an iterable at the end of the array."""
+        self._data.extend(values)
+
     def pop(self):
         """Remove element from end of the array and return it."""
         return self._data.pop()
@@ -78,6 +85,61 @@ class DynamicArray:
         return len(self._data)
 
 
+def as_list(items) -> list:
+    """
+    Return the elements of a DynamicArray, or of any other iterable, as a
+    list. Lists are returned as they are.
+    """
+    if isinstance(items, list):
+        return items
+    return list(items)
+
+
+def chunked(iterable, size: int):
+    """
+    Return a generator of lists of size elements taken from the iterable
+    in order, the last list can be shorter.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    iterator = iter(iterable)
+
+    def chunks():
+        chunk = list(islice(iterator, size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(iterator, size))
+
+    return chunks()
+
+
+class HashMapValuesView(ValuesView):
+    """
+    values() view of a hash map, reads the values straight out of the
+    map's buckets instead of looking every key up again
+    """
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Return an iterator over the values."""
+        for _, value in self._mapping._iter_items():
+            yield value
+
+
+class HashMapItemsView(ItemsView):
+    """
+    items() view of a hash map, reads the pairs straight out of the
+    map's buckets instead of looking every key up again
+    """
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Return an iterator over the (key, value) pairs."""
+        return self._mapping._iter_items()
+
+
 def hash_function_1(key: str) -> int:
     """Sample Hash function #1 to be used with HashMap implementation"""
     hash = 0
@@ -96,6 +158,216 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+# prime table sizes. from 5 on each is the smallest prime at least twice the
+# one before, so doubling a size lands on the next one. the last is past the longest
+# list Python can allocate, so every table size is covered
+PRIME_SIZES = (
+    3, 5, 11, 23, 47, 97, 197, 397, 797, 1597, 3203, 6421, 12853, 25717, 51437,
+    102877, 205759, 411527, 823117, 1646237, 3292489, 6584983, 13169977,
+    26339969, 52679969, 105359939, 210719881, 421439783, 842879579, 1685759167,
+    3371518343, 6743036717, 13486073473, 26972146961, 53944293929,
+    107888587883, 215777175787, 431554351609, 863108703229, 1726217406467,
+    3452434812973, 6904869625999, 13809739252051, 27619478504183,
+    55238957008387, 110477914016779, 220955828033581, 441911656067171,
+    883823312134381, 1767646624268779, 3535293248537579, 7070586497075177,
+    14141172994150357, 28282345988300791, 56564691976601587,
+    113129383953203213, 226258767906406483, 452517535812813007,
+    905035071625626043, 1810070143251252131, 3620140286502504283,
+    7240280573005008577, 14480561146010017169
+)
+
+# witnesses that make Miller-Rabin exact for every number below 3.3 * 10^24
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def is_prime(number: int) -> bool:
+    """Determine if given integer is a prime number using Miller-Rabin."""
+    if number < 2:
+        return False
+    for witness in _WITNESSES:
+        if number % witness == 0:
+            return number == witness
+
+    odd, twos = number - 1, 0
+    while odd % 2 == 0:
+        odd //= 2
+        twos += 1
+    for witness in _WITNESSES:
+        power = pow(witness, odd, number)
+        if power == 1 or power == number - 1:
+            continue
+        for _ in range(twos - 1):
+            power = power * power % number
+            if power == number - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def next_prime(capacity: int) -> int:
+    """Return the smallest size in PRIME_SIZES that is at least capacity."""
+    return PRIME_SIZES[bisect_left(PRIME_SIZES, capacity)]
+
+
+def previous_prime(capacity: int) -> int:
+    """Return the largest size in PRIME_SIZES below capacity (or the first)."""
+    return PRIME_SIZES[max(bisect_left(PRIME_SIZES, capacity) - 1, 0)]
+
+
+def next_power_of_two(capacity: int) -> int:
+    """Return the smallest power of two that is at least capacity (and 2)."""
+    return 1 << (max(capacity, 2) - 1).bit_length()
+
+
+def mix_hash(hash: int) -> int:
+    """
+    64 bit finalizer from MurmurHash3. Spreads every bit of the hash into
+    the low bits so that masking with a power of two stays well distributed
+    even for weak hash functions.
+    """
+    hash &= 0xFFFFFFFFFFFFFFFF
+    hash ^= hash >> 33
+    hash = (hash * 0xFF51AFD7ED558CCD) & 0xFFFFFFFFFFFFFFFF
+    hash ^= hash >> 33
+    hash = (hash * 0xC4CEB9FE1A85EC53) & 0xFFFFFFFFFFFFFFFF
+    hash ^= hash >> 33
+    return hash
+
+
+def hash_function_builtin(key: str) -> int:
+    """
+    Hash function wrapping Python's built-in hash, the fastest option.
+    String hashes are randomized per process unless PYTHONHASHSEED is set,
+    so the values can't be shared between processes
+    """
+    return hash(key)
+
+
+FNV_OFFSET_BASIS = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+
+def hash_function_fnv1a(key: str) -> int:
+    """64 bit FNV-1a hash over the UTF-8 bytes of the key"""
+    hash = FNV_OFFSET_BASIS
+    for byte in key.encode():
+        hash = ((hash ^ byte) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return hash
+
+
+# the polynomial hash works modulo the Mersenne prime 2^61 - 1
+POLY_MODULUS = (1 << 61) - 1
+
+
+def make_poly_hash(seed: int = None):
+    """
+    Return a polynomial hash over the UTF-8 bytes of the key modulo
+    2^61 - 1, whose base the seed picks. Seed 0 is base 256, which reads
+    the key's bytes as one big integer, so it is computed by int.from_bytes
+    in C; any other seed gives a base in [2, 2^61 - 2], computed byte by
+    byte with Horner's rule from a leading 1, so keys that differ only in
+    leading zero bytes differ too. Two different keys of at most n bytes
+    have the same hash for at most n of the bases, so which keys collide
+    changes with the seed. Both vectorize column by column over a batch
+    of keys.
+    None picks a random seed, so a function made once at start up places
+    keys differently in every process
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'little')
+    seed %= POLY_MODULUS - 3
+    base = 256 if seed == 0 else seed + 2
+
+    if base == 256:
+        def hash_function_poly(key: str) -> int:
+            """Polynomial hash of the key, see make_poly_hash"""
+            return int.from_bytes(key.encode(), 'big') % POLY_MODULUS
+    else:
+        def hash_function_poly(key: str) -> int:
+            """Polynomial hash of the key, see make_poly_hash"""
+            hash = 1
+            for byte in key.encode():
+                hash = (hash * base + byte) % POLY_MODULUS
+            return hash
+
+    hash_function_poly.seed = seed
+    hash_function_poly.base = base
+    return hash_function_poly
+
+
+hash_function_poly = make_poly_hash(0)
+
+
+def _rotate_left(value: int, bits: int) -> int:
+    """Rotate a 64 bit value left by the given number of bits."""
+    return ((value << bits) | (value >> (64 - bits))) & 0xFFFFFFFFFFFFFFFF
+
+
+def siphash24(k0: int, k1: int, data: bytes) -> int:
+    """
+    SipHash-2-4 of data under the 128 bit key (k0, k1), a keyed hash that
+    an attacker can't find collisions for without knowing the key
+    """
+    mask = 0xFFFFFFFFFFFFFFFF
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    length = len(data)
+    words = list(struct.unpack_from('<%dQ' % (length // 8), data))
+    last = (length & 0xFF) << 56
+    for i, byte in enumerate(data[length - length % 8:]):
+        last |= byte << (8 * i)
+    words.append(last)
+
+    for word in words:
+        v3 ^= word
+        for _ in range(2):
+            v0 = (v0 + v1) & mask
+            v1 = _rotate_left(v1, 13) ^ v0
+            v0 = _rotate_left(v0, 32)
+            v2 = (v2 + v3) & mask
+            v3 = _rotate_left(v3, 16) ^ v2
+            v0 = (v0 + v3) & mask
+            v3 = _rotate_left(v3, 21) ^ v0
+            v2 = (v2 + v1) & mask
+            v1 = _rotate_left(v1, 17) ^ v2
+            v2 = _rotate_left(v2, 32)
+        v0 ^= word
+
+    v2 ^= 0xFF
+    for _ in range(4):
+        v0 = (v0 + v1) & mask
+        v1 = _rotate_left(v1, 13) ^ v0
+        v0 = _rotate_left(v0, 32)
+        v2 = (v2 + v3) & mask
+        v3 = _rotate_left(v3, 16) ^ v2
+        v0 = (v0 + v3) & mask
+        v3 = _rotate_left(v3, 21) ^ v0
+        v2 = (v2 + v1) & mask
+        v1 = _rotate_left(v1, 17) ^ v2
+        v2 = _rotate_left(v2, 32)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def make_keyed_hash(key: bytes = None):
+    """
+    Return a SipHash-2-4 hash function under a 16 byte key, a random one
+    when no key is given. Used by the hardened mode of both HashMaps
+    """
+    if key is None:
+        key = os.urandom(16)
+    k0, k1 = struct.unpack('<QQ', key)
+
+    def hash_function_siphash(key: str) -> int:
+        """Keyed SipHash-2-4 of the UTF-8 bytes of the key"""
+        return siphash24(k0, k1, key.encode())
+
+    return hash_function_siphash
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -103,11 +375,15 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None,
+                 hash: int = None) -> None:
+        """Initialize node given a key, value and optionally the key's hash."""
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -119,6 +395,8 @@ class LinkedListIterator:
     Separate iterator class for LinkedList
     """
 
+    __slots__ = ('_node',)
+
     def __init__(self, current_node: SLNode) -> None:
         """Initialize the iterator with a node."""
         self._node = current_node
@@ -144,6 +422,8 @@ class LinkedList:
     Supported methods are: insert, remove, contains, length, iterator
     """
 
+    __slots__ = ('_head', '_size')
+
     def __init__(self) -> None:
         """
         Initialize new linked list;
@@ -154,34 +434,34 @@ class LinkedList:
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
-        if not self._head:
-            return "SLL []"
-
-        content = str(self._head)
-        node = self._head.next
-        while node:
-            content += ' -> ' + str(node)
-            node = node.next
-        return 'SLL [' + content + ']'
+        return 'SLL [' + ' -> '.join([str(node) for node in self]) + ']'
 
     def __iter__(self) -> LinkedListIterator:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
+    def insert(self, key: str, value: object, hash: int = None) -> None:
         """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+        self._head = SLNode(key, value, self._head, hash)
+        self._size += 1
+
+    def insert_node(self, node: SLNode) -> None:
+        """Link an existing node in at the front of the list."""
+        node.next = self._head
+        self._head = node
         self._size += 1
 
-    def remove(self, key: str) -> bool:
+    def remove(self, key: str, hash: int = None) -> bool:
         """
         Remove first node with matching key.
+        When the key's hash is given, nodes with another cached hash are
+        skipped without comparing keys.
         Return True if removal was successful, False otherwise.
         """
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 if previous:
                     previous.next = node.next
                 else:
@@ -192,11 +472,22 @@ class LinkedList:
             previous, node = node, node.next
         return False
 
-    def contains(self, key: str) -> SLNode:
-        """Return node with matching key, or None if no match"""
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        When the key's hash is given, nodes with another cached hash are
+        skipped without comparing keys.
+        """
         node = self._head
+        if hash is None:
+            while node:
+                if node.key == key:
+                    return node
+                node = node.next
+            return node
+
         while node:
-            if node.key == key:
+            if node.hash == hash and node.key == key:
                 return node
             node = node.next
         return node
@@ -206,14 +497,93 @@ class LinkedList:
         return self._size
 
 
+class SortedBucket:
+    """
+    Bucket for long chains, kept sorted by (hash, key) so a lookup is a
+    binary search instead of a walk down the list. Holds the same SLNodes
+    and supports the same methods as LinkedList, keys have to be orderable
+    """
+
+    __slots__ = ('_keys', '_nodes')
+
+    def __init__(self, nodes=()) -> None:
+        """Initialize the bucket, optionally with the nodes of another bucket."""
+        self._keys = []
+        self._nodes = []
+        for node in nodes:
+            self.insert_node(node)
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'SB [' + ' -> '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes in (hash, key) order."""
+        return iter(self._nodes)
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """Insert a new node at its sorted position."""
+        self.insert_node(SLNode(key, value, None, hash))
+
+    def insert_node(self, node: SLNode) -> None:
+        """Link an existing node in at its sorted position."""
+        node.next = None
+        sort_key = (node.hash, node.key)
+        index = bisect_left(self._keys, sort_key)
+        self._keys.insert(index, sort_key)
+        self._nodes.insert(index, node)
+
+    def _index(self, key: str, hash: int) -> int:
+        """Return the position of the key, or -1 if it is not in the bucket."""
+        if hash is None:
+            for index, node in enumerate(self._nodes):
+                if node.key == key:
+                    return index
+            return -1
+
+        sort_key = (hash, key)
+        index = bisect_left(self._keys, sort_key)
+        if index < len(self._keys) and self._keys[index] == sort_key:
+            return index
+        return -1
+
+    def remove(self, key: str, hash: int = None) -> bool:
+        """
+        Remove the node with matching key.
+        Without the key's hash every node has to be checked.
+        Return True if removal was successful, False otherwise.
+        """
+        index = self._index(key, hash)
+        if index < 0:
+            return False
+        del self._keys[index]
+        del self._nodes[index]
+        return True
+
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        Without the key's hash every node has to be checked.
+        """
+        index = self._index(key, hash)
+        return self._nodes[index] if index >= 0 else None
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+
 # ---------- For use in Open Addressing (OA) HashMap  ---------- #
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
+    __slots__ = ('key', 'value', 'is_tombstone', 'hash')
+
+    def __init__(self, key: str, value: object, hash: int = None) -> None:
         """Initialize an entry for use in a hash map."""
         self.key = key
         self.value = value
+        self.hash = hash
 
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
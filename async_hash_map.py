@@ -0,0 +1,297 @@
+# Course: CS261 - Data Structures
+# Description: asyncio facade for the hash maps. the batch operations and
+#              find_mode do their work in slices and give the event loop a
+#              turn whenever a slice has used up its time budget, and
+#              resizes run as incremental migrations the map does a little
+#              at a time, so no single step holds the loop for a whole
+#              rehash. automatic garbage collection is off while a batch
+#              runs and the young generations are collected between its
+#              slices, and what survives the batch is frozen at the end,
+#              so no full collection over the map has to run afterwards.
+
+
+import asyncio
+import gc
+import time
+
+from a6_include import DynamicArray, hash_function_fnv1a
+from hash_map_sc import HashMap as SCHashMap
+
+
+# seconds a slice may run before the event loop gets a turn
+BUDGET = 0.002
+
+# slots of a resize finish_resize does between two looks at the clock
+MIGRATE_STEP = 16
+
+# batches running at the moment, over every AsyncHashMap. the first one
+# turns automatic garbage collection off and the last one to end freezes
+# what survived and turns it back on, if it was on before
+_batches = 0
+_gc_enabled = False
+
+
+def _begin_batch() -> None:
+    """
+    turns automatic garbage collection off for a batch
+    """
+    global _batches, _gc_enabled
+    if not _batches:
+        _gc_enabled = gc.isenabled()
+        gc.disable()
+    _batches += 1
+
+
+def _end_batch() -> None:
+    """
+    turns automatic garbage collection back on once no batch is running.
+    the young generations are collected first and everything left is
+    frozen, since the collections put off during the batch would
+    otherwise run as one full collection over every entry it added
+    """
+    global _batches
+    _batches -= 1
+    if not _batches and _gc_enabled:
+        gc.collect(1)
+        gc.freeze()
+        gc.enable()
+
+
+class AsyncHashMap:
+    """
+    wraps a chaining or open addressing HashMap built with
+    incremental_resize=True. put_many, get_many and remove_many look at
+    the clock after every entry and give the event loop a turn once the
+    slice has run for budget seconds, so a slice goes over the budget by
+    one operation at most, however much dearer the operations get while
+    a resize drains its old table. the resizes themselves are left to the
+    map, whose every operation does a bounded share of one.
+
+    a full garbage collection walks every object on the heap, and with a
+    big map that takes far longer than a slice. while any batch runs the
+    collector's automatic passes are off and each slice ends by collecting
+    the two young generations, which only hold what was allocated since
+    the slice before. when the last batch ends, everything the collector
+    tracks is moved to its permanent generation with gc.freeze(), so the
+    entries the batches added are left out of full collections from then
+    on; they are still freed once nothing refers to them, and
+    gc.unfreeze() hands them back to the collector. with the collector
+    already off nothing is collected or frozen.
+
+    get, put, remove and contains_key stay plain methods: with incremental
+    resizing each of them does a bounded amount of work. a hardened map's
+    reseed still rehashes in one go
+    """
+
+    def __init__(self, m, budget: float = BUDGET) -> None:
+        """
+        Initialize new AsyncHashMap over m, giving the loop a turn every
+        budget seconds of work
+        """
+        if not m.is_incremental():
+            raise ValueError("AsyncHashMap needs a map built with incremental_resize=True")
+        if budget < 0:
+            raise ValueError("budget can't be negative")
+        self._map = m
+        self._budget = budget
+        self._deadline = 0.0
+
+    @property
+    def map(self):
+        """the wrapped map"""
+        return self._map
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        returns the value associated with the given key, or default
+        """
+        return self._map.get(key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        returns True if the key is in the hash map or False otherwise
+        """
+        return self._map.contains_key(key)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map
+        """
+        self._map.put(key, value)
+
+    def remove(self, key: str) -> None:
+        """
+        removes the key from the map
+        """
+        self._map.remove(key)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def __len__(self) -> int:
+        """
+        returns the number of keys in the map
+        """
+        return self._map.get_size()
+
+    def _start_slice(self) -> None:
+        """
+        starts the clock of the budget
+        """
+        self._deadline = time.perf_counter() + self._budget
+
+    async def _next_slice(self) -> None:
+        """
+        gives the loop a turn and starts a new slice, which begins by
+        collecting the young generations on the slice's own time
+        """
+        await asyncio.sleep(0)
+        self._start_slice()
+        if _gc_enabled:
+            gc.collect(1)
+
+    async def finish_resize(self) -> None:
+        """
+        completes a resize in progress a slice at a time
+        """
+        _begin_batch()
+        try:
+            self._start_slice()
+            clock = time.perf_counter
+            while self._map.migration_pending():
+                self._map.migrate_step(MIGRATE_STEP)
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+
+    async def put_many(self, pairs) -> None:
+        """
+        puts every (key, value) pair of pairs, a DynamicArray or any other
+        iterable
+        """
+        _begin_batch()
+        try:
+            self._start_slice()
+            clock, put = time.perf_counter, self._map.put
+            for key, value in pairs:
+                put(key, value)
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+
+    async def get_many(self, keys) -> list:
+        """
+        returns a list with the value of each key in keys (a DynamicArray
+        or any other iterable), None for the keys that are not in the map
+        """
+        _begin_batch()
+        try:
+            self._start_slice()
+            clock, get = time.perf_counter, self._map.get
+            values = []
+            for key in keys:
+                values.append(get(key))
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+        return values
+
+    async def remove_many(self, keys) -> int:
+        """
+        removes every key in keys (a DynamicArray or any other iterable)
+        and returns how many of them were in the map
+        """
+        _begin_batch()
+        try:
+            self._start_slice()
+            clock, remove = time.perf_counter, self._map.remove
+            size = self._map.get_size()
+            for key in keys:
+                remove(key)
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+        return size - self._map.get_size()
+
+    async def increment_many(self, keys) -> int:
+        """
+        adds 1 to the value of every key in keys (a DynamicArray or any
+        other iterable), counting from 0 for a key not in the map, and
+        returns the highest value reached, 0 when there are no keys.
+        needs a map with increment, the chaining one
+        """
+        _begin_batch()
+        try:
+            self._start_slice()
+            clock, increment = time.perf_counter, self._map.increment
+            highest = 0
+            for key in keys:
+                value = increment(key)
+                if value > highest:
+                    highest = value
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+        return highest
+
+    async def items(self):
+        """
+        yields every (key, value) pair of the map, giving the loop turns
+        along the way. a resize in progress is finished first, and the
+        map must not change until the iteration is done. the collector
+        stays off until the iteration ends or the generator is closed
+        """
+        _begin_batch()
+        try:
+            await self.finish_resize()
+            self._start_slice()
+            clock = time.perf_counter
+            for pair in self._map.items():
+                yield pair
+                if clock() >= self._deadline:
+                    await self._next_slice()
+        finally:
+            _end_batch()
+
+
+async def find_mode(values, function: callable = hash_function_fnv1a,
+                    budget: float = BUDGET) -> (DynamicArray, int):
+    """
+    hash_map_sc.find_mode for the event loop: counts values (a DynamicArray
+    or any other iterable) into an incrementally resized chaining map and
+    collects the most common ones, in slices of about budget seconds.
+    the map hashes with function; hash_function_1, which find_mode uses,
+    piles short similar values into a few long chains and migrating one
+    of those is a long step. returns the array of most common value(s)
+    and the frequency
+    """
+    counts = AsyncHashMap(SCHashMap(11, function, max_load=1.0, min_load=0.25,
+                                    incremental_resize=True),
+                          budget)
+    # one batch from start to end, so the collector stays off in between
+    _begin_batch()
+    try:
+        max_frequency = await counts.increment_many(values)
+
+        modes = DynamicArray()
+        keys = []
+        async for key, count in counts.items():
+            keys.append(key)
+            if count == max_frequency:
+                modes.append(key)
+
+        # dropping the counts in one go would free every node at once,
+        # removing them lets them go a few at a time while the table shrinks
+        await counts.remove_many(keys)
+        await counts.finish_resize()
+    finally:
+        _end_batch()
+    return modes, max_frequency
@@ -0,0 +1,133 @@
+# Course: CS261 - Data Structures
+# Description: event loop lag benchmark for AsyncHashMap. a ticker task
+#              records the longest time the loop went without getting back
+#              to it while each workload runs, for the async facade and for
+#              the same work done by a plain map in one blocking call.
+#              the lag is wall clock time, garbage collection included,
+#              and the run fails, naming the workloads, when an async lag
+#              is over --budget. with --no-gc the collector is off for the
+#              whole run, which shows the lag without any collections.
+#
+#              python bench_async.py
+#              python bench_async.py --keys 1000000 --budget 5 --no-gc
+
+
+import argparse
+import asyncio
+import gc
+import sys
+import time
+
+from a6_include import DynamicArray, hash_function_fnv1a
+from async_hash_map import AsyncHashMap, find_mode
+from hash_map_oa import HashMap as OAHashMap
+from hash_map_sc import HashMap as SCHashMap, find_mode as blocking_find_mode
+
+
+MAP_TYPES = {
+    'sc': lambda **options: SCHashMap(11, hash_function_fnv1a, max_load=1.0,
+                                      min_load=0.25, **options),
+    'oa': lambda **options: OAHashMap(11, hash_function_fnv1a, **options),
+}
+
+
+async def with_lag(work) -> (float, float):
+    """
+    runs the work coroutine next to a ticker and returns the longest
+    stretch the ticker waited for the loop and the seconds the work took
+    """
+    # garbage the workload before left behind is collected here, not on
+    # this one's time
+    gc.collect()
+    longest = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal longest
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0)
+            longest = max(longest, time.perf_counter() - before)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await work
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return longest, elapsed
+
+
+async def workloads(name: str, count: int) -> list:
+    """
+    returns (workload, mode, longest lag, seconds) for every workload
+    on one map type, blocking and async
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    pairs = [(key, key) for key in keys]
+    rows = []
+
+    async def blocking(call, *arguments):
+        return call(*arguments)
+
+    plain = MAP_TYPES[name]()
+    facade = AsyncHashMap(MAP_TYPES[name](incremental_resize=True))
+    for workload, blocking_call, async_call, argument in (
+            ('put_many', plain.put_many, facade.put_many, pairs),
+            ('get_many', plain.get_many, facade.get_many, keys),
+            ('remove_many', plain.remove_many, facade.remove_many, keys),
+    ):
+        rows.append((workload, 'blocking') + await with_lag(blocking(blocking_call, argument)))
+        rows.append((workload, 'async') + await with_lag(async_call(argument)))
+    return rows
+
+
+async def run(args) -> list:
+    """
+    returns the rows of every map type and of find_mode
+    """
+    rows = []
+    for name in args.maps:
+        for row in await workloads(name, args.keys):
+            rows.append((name,) + row)
+
+    words = DynamicArray([str(i % (args.keys // 10 + 1)) for i in range(args.keys)])
+
+    async def blocking():
+        return blocking_find_mode(words)
+
+    rows.append(('sc', 'find_mode', 'blocking') + await with_lag(blocking()))
+    rows.append(('sc', 'find_mode', 'async') + await with_lag(find_mode(words)))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=200000)
+    parser.add_argument('--maps', nargs='+', choices=MAP_TYPES,
+                        default=list(MAP_TYPES))
+    parser.add_argument('--budget', type=float, default=5.0,
+                        help='fail if an async workload holds the loop longer, in ms')
+    parser.add_argument('--no-gc', action='store_true',
+                        help='turn the garbage collector off')
+    args = parser.parse_args()
+
+    if args.no_gc:
+        gc.disable()
+
+    print(f"{'map':<6}{'workload':<14}{'mode':<10}{'max lag ms':>12}{'seconds':>10}")
+    over_budget = []
+    for name, workload, mode, lag, elapsed in asyncio.run(run(args)):
+        print(f"{name:<6}{workload:<14}{mode:<10}{lag * 1000:>12.2f}{elapsed:>10.2f}")
+        if mode == 'async' and lag * 1000 > args.budget:
+            over_budget.append(f"{name} {workload} {lag * 1000:.2f} ms")
+
+    if over_budget:
+        print(f"\nover the {args.budget} ms budget: " + ', '.join(over_budget))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
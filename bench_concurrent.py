@@ -0,0 +1,116 @@
+# Course: CS261 - Data Structures
+# Description: multi threaded throughput benchmark for ConcurrentHashMap.
+#              every thread runs the same mix of gets and puts on a shared
+#              map, and the total operations per second are reported for
+#              each thread count next to a chaining map behind one lock.
+#              on a build with the GIL only one thread runs Python code at
+#              a time, so the numbers show what the locking costs; they
+#              scale with the threads on a free threaded build.
+#
+#              python bench_concurrent.py
+#              python bench_concurrent.py --threads 1 2 4 8 16 --reads 0.5
+
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from concurrent_hash_map import ConcurrentHashMap
+from hash_map_sc import HashMap as SCHashMap
+
+
+class LockedHashMap:
+    """
+    chaining map with a single lock around every call, the baseline
+    """
+
+    def __init__(self) -> None:
+        self._map = SCHashMap(11, hash, max_load=1.0)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> object:
+        with self._lock:
+            return self._map.get(key)
+
+    def put(self, key: str, value: object) -> None:
+        with self._lock:
+            self._map.put(key, value)
+
+
+MAP_TYPES = {
+    'concurrent': lambda: ConcurrentHashMap(11, hash),
+    'locked': LockedHashMap,
+}
+
+
+def worker(m, keys: list, operations: list, barrier: threading.Barrier) -> None:
+    """
+    runs the operations, True for a put and False for a get, on keys
+    """
+    barrier.wait()
+    get, put = m.get, m.put
+    for key, is_put in zip(keys, operations):
+        if is_put:
+            put(key, key)
+        else:
+            get(key)
+
+
+def measure(factory, threads: int, count: int, key_space: int, reads: float) -> float:
+    """
+    returns the operations per second of threads threads running count
+    operations between them on a map prefilled with half the key space
+    """
+    m = factory()
+    for i in range(0, key_space, 2):
+        m.put('key' + str(i), i)
+
+    rng = random.Random(threads)
+    per_thread = count // threads
+    work = []
+    for _ in range(threads):
+        keys = ['key' + str(rng.randrange(key_space)) for _ in range(per_thread)]
+        operations = [rng.random() >= reads for _ in range(per_thread)]
+        work.append((keys, operations))
+
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(m, keys, operations, barrier))
+            for keys, operations in work]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--operations', type=int, default=400000)
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--reads', type=float, default=0.9,
+                        help='fraction of the operations that are gets')
+    parser.add_argument('--maps', nargs='+', choices=MAP_TYPES,
+                        default=list(MAP_TYPES))
+    args = parser.parse_args()
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'map':<12}{'threads':>8}{'ops/s':>14}{'vs 1 thread':>13}")
+    for name in args.maps:
+        single = None
+        for threads in args.threads:
+            rate = measure(MAP_TYPES[name], threads, args.operations, args.keys, args.reads)
+            single = single or rate
+            print(f"{name:<12}{threads:>8}{rate:>14.0f}{rate / single:>12.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# Course: CS261 - Data Structures
+# Description: hash quality benchmark. for every hash function and key set
+#              reports the hashing throughput, the chain lengths a separate
+#              chaining table at load 1.0 would get and the probe lengths
+#              a quadratic probing table at load 0.5 would get.
+#
+#              python bench_hash.py
+#              python bench_hash.py --count 100000 --functions fnv1a poly
+
+
+import argparse
+import random
+import string
+import time
+
+from a6_include import (hash_function_1, hash_function_2, hash_function_builtin,
+                        hash_function_fnv1a, hash_function_poly, next_prime)
+
+
+HASH_FUNCTIONS = {
+    'function_1': hash_function_1,
+    'function_2': hash_function_2,
+    'builtin': hash_function_builtin,
+    'fnv1a': hash_function_fnv1a,
+    'poly': hash_function_poly,
+}
+
+
+def sequential_keys(count: int, rng: random.Random) -> list:
+    """keys like the ones the assignment tests use: key0, key1, ..."""
+    return ['key' + str(i) for i in range(count)]
+
+
+def word_keys(count: int, rng: random.Random) -> list:
+    """distinct lowercase words of 3 to 12 letters"""
+    keys = set()
+    while len(keys) < count:
+        keys.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))))
+    return list(keys)
+
+
+def anagram_keys(count: int, rng: random.Random) -> list:
+    """distinct permutations of a handful of words, the worst case for sums"""
+    keys = set()
+    bases = [''.join(rng.choices(string.ascii_lowercase, k=10)) for _ in range(8)]
+    while len(keys) < count:
+        letters = list(rng.choice(bases))
+        rng.shuffle(letters)
+        keys.add(''.join(letters))
+    return list(keys)
+
+
+def uuid_keys(count: int, rng: random.Random) -> list:
+    """32 character hex identifiers"""
+    return ['%032x' % rng.getrandbits(128) for _ in range(count)]
+
+
+def url_keys(count: int, rng: random.Random) -> list:
+    """long keys sharing a common prefix"""
+    return [f"https://example.com/api/v1/users/{rng.randrange(10 ** 6)}/items/{i}"
+            for i in range(count)]
+
+
+KEY_SETS = {
+    'sequential': sequential_keys,
+    'words': word_keys,
+    'anagrams': anagram_keys,
+    'uuids': uuid_keys,
+    'urls': url_keys,
+}
+
+
+def percentile(values: list, fraction: float) -> int:
+    """returns the value below which the given fraction of values fall"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def chain_lengths(hashes: list) -> list:
+    """lengths of the non-empty chains of a prime table at load 1.0"""
+    capacity = next_prime(len(hashes))
+    counts = [0] * capacity
+    for hash in hashes:
+        counts[hash % capacity] += 1
+    return [count for count in counts if count]
+
+
+def probe_lengths(hashes: list) -> list:
+    """
+    number of slots each insert visits in a quadratic probing table of
+    prime capacity at load 0.5, the layout hash_map_oa.HashMap uses
+    """
+    capacity = next_prime(2 * len(hashes))
+    used = bytearray(capacity)
+    lengths = []
+    for hash in hashes:
+        index = hash % capacity
+        step = 1
+        probes = 1
+        while used[index]:
+            index = (index + step) % capacity
+            step += 2
+            probes += 1
+        used[index] = 1
+        lengths.append(probes)
+    return lengths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--functions', nargs='+', choices=HASH_FUNCTIONS,
+                        default=list(HASH_FUNCTIONS))
+    parser.add_argument('--key-sets', nargs='+', choices=KEY_SETS,
+                        default=list(KEY_SETS))
+    parser.add_argument('--seed', type=int, default=261)
+    args = parser.parse_args()
+
+    print(f"{'keys':<12}{'function':<12}{'keys/sec':>12}{'distinct':>10}"
+          f"{'chain avg':>11}{'chain max':>11}{'probe avg':>11}{'probe p99':>11}{'probe max':>11}")
+    for set_name in args.key_sets:
+        keys = KEY_SETS[set_name](args.count, random.Random(args.seed))
+        for name in args.functions:
+            function = HASH_FUNCTIONS[name]
+
+            start = time.perf_counter()
+            hashes = [function(key) for key in keys]
+            elapsed = time.perf_counter() - start
+
+            chains = chain_lengths(hashes)
+            probes = probe_lengths(hashes)
+            print(f"{set_name:<12}{name:<12}{len(keys) / elapsed:>12.0f}"
+                  f"{len(set(hashes)):>10}{sum(chains) / len(chains):>11.2f}"
+                  f"{max(chains):>11}{sum(probes) / len(probes):>11.2f}"
+                  f"{percentile(probes, 0.99):>11}{max(probes):>11}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
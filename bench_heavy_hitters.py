@@ -0,0 +1,87 @@
+# Course: CS261 - Data Structures
+# Description: accuracy and throughput benchmark for SpaceSaving. counts a
+#              Zipf distributed stream exactly with find_mode and
+#              ModeCounter and approximately with SpaceSaving at each
+#              epsilon, and reports values per second, the entries each
+#              one holds, whether the mode matches, the recall of the top
+#              k and the largest count error.
+#
+#              python bench_heavy_hitters.py
+#              python bench_heavy_hitters.py --values 1000000 --vocabulary 1000000
+
+
+import argparse
+import itertools
+import random
+import sys
+import time
+
+from a6_include import DynamicArray
+from hash_map_sc import find_mode
+from heavy_hitters import SpaceSaving
+from mode_counter import ModeCounter
+
+
+def zipf_stream(count: int, vocabulary: int, skew: float, seed: int) -> list:
+    """
+    returns count values drawn from vocabulary words, the word of rank r
+    weighted 1 / r ** skew
+    """
+    weights = itertools.accumulate(1 / rank ** skew for rank in range(1, vocabulary + 1))
+    words = random.Random(seed).choices(range(vocabulary), cum_weights=list(weights), k=count)
+    return ['w' + str(word) for word in words]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--values', type=int, default=500000)
+    parser.add_argument('--vocabulary', type=int, default=200000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--epsilons', type=float, nargs='+',
+                        default=[0.01, 0.001, 0.0001])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    values = zipf_stream(args.values, args.vocabulary, args.skew, args.seed)
+    da = DynamicArray(values)
+
+    print(f"{'counter':<22}{'values/s':>12}{'entries':>10}{'mode':>7}"
+          f"{'top-k':>8}{'max error':>11}")
+
+    start = time.perf_counter()
+    modes, frequency = find_mode(da)
+    find_mode_rate = len(values) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    exact = ModeCounter()
+    exact.update(values)
+    counter_rate = len(values) / (time.perf_counter() - start)
+
+    for name, rate in (('find_mode', find_mode_rate), ('ModeCounter', counter_rate)):
+        print(f"{name:<22}{rate:>12.0f}{exact.get_size():>10}{'yes':>7}"
+              f"{1:>8.2f}{0:>11}")
+
+    counts = dict(exact.items())
+    exact_modes = sorted(modes)
+    top = sorted(counts, key=counts.get, reverse=True)[:args.k]
+
+    for epsilon in args.epsilons:
+        start = time.perf_counter()
+        summary = SpaceSaving(epsilon=epsilon)
+        summary.update(values)
+        elapsed = time.perf_counter() - start
+
+        approx_modes, _ = summary.mode()
+        found = [value for value, _, _ in summary.top_k(args.k)]
+        recall = len(set(found) & set(top)) / len(top)
+        error = max(count - counts[value] for value, count, _ in summary.top_k(len(summary)))
+        print(f"{'SpaceSaving e=' + str(epsilon):<22}{len(values) / elapsed:>12.0f}"
+              f"{len(summary):>10}{'yes' if sorted(approx_modes) == exact_modes else 'no':>7}"
+              f"{recall:>8.2f}{error:>11}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
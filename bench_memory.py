@@ -0,0 +1,74 @@
+# Course: CS261 - Data Structures
+# Description: memory benchmark for the hash maps. reports the bytes used
+#              per entry by each map type, measured with tracemalloc.
+#
+#              python bench_memory.py
+#              python bench_memory.py --sizes 10000 100000 --max-bytes 200
+
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from hash_map_oa import CompactHashMap, HashMap as OAHashMap
+from hash_map_sc import HashMap as SCHashMap
+
+
+# every map uses the built in hash so the key distribution does not
+# dominate the run time at the larger sizes
+MAP_TYPES = {
+    'sc': lambda: SCHashMap(11, hash, max_load=1.0),
+    'oa': lambda: OAHashMap(11, hash),
+    'oa-compact': lambda: CompactHashMap(11, hash),
+}
+
+
+def measure(factory, count: int) -> (float, float, float):
+    """
+    builds a map of count keys and returns the bytes per entry it holds
+    once built, the peak bytes per entry while building and the seconds
+    it took. keys and values are allocated before tracing starts, so only
+    the map itself is counted
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    gc.collect()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    m = factory()
+    for key in keys:
+        m.put(key, key)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del m
+    return current / count, peak / count, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10 ** 4, 10 ** 6, 10 ** 7])
+    parser.add_argument('--maps', nargs='+', choices=MAP_TYPES,
+                        default=list(MAP_TYPES))
+    parser.add_argument('--max-bytes', type=float, default=None,
+                        help='fail if any map uses more bytes per entry')
+    args = parser.parse_args()
+
+    print(f"{'map':<12}{'keys':>10}{'bytes/entry':>14}{'peak/entry':>14}{'seconds':>10}")
+    over_budget = False
+    for name in args.maps:
+        for count in args.sizes:
+            per_entry, peak, elapsed = measure(MAP_TYPES[name], count)
+            print(f"{name:<12}{count:>10}{per_entry:>14.1f}{peak:>14.1f}{elapsed:>10.2f}")
+            if args.max_bytes is not None and per_entry > args.max_bytes:
+                over_budget = True
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Course: CS261 - Data Structures
+# Description: throughput benchmark for ShardedHashMap. runs a bulk load
+#              and a mixed read/write workload, both as batches, on a map
+#              in this process and on sharded maps with each shard count,
+#              and reports keys per second for each.
+#
+#              python bench_sharded.py
+#              python bench_sharded.py --shards 2 4 8 --keys 1000000 --map oa
+
+
+import argparse
+import random
+import sys
+import time
+
+from a6_include import hash_function_fnv1a
+from sharded_hash_map import MAP_TYPES, ShardedHashMap
+
+
+def bulk_load(m, keys: list, batch: int) -> None:
+    """puts every key, batch keys at a time"""
+    for start in range(0, len(keys), batch):
+        m.put_many([(key, key) for key in keys[start:start + batch]])
+
+
+def mixed(m, keys: list, batch: int, reads: float, rng: random.Random) -> None:
+    """
+    runs batches of get_many and put_many over random keys, reads of
+    every batch being gets
+    """
+    for start in range(0, len(keys), batch):
+        chunk = [keys[rng.randrange(len(keys))] for _ in range(min(batch, len(keys) - start))]
+        split = int(len(chunk) * reads)
+        m.get_many(chunk[:split])
+        m.put_many([(key, key) for key in chunk[split:]])
+
+
+def measure(m, keys: list, batch: int, reads: float) -> (float, float):
+    """
+    returns the keys per second of the bulk load and of the mixed
+    workload that follows it on the same map
+    """
+    start = time.perf_counter()
+    bulk_load(m, keys, batch)
+    load_rate = len(keys) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    mixed(m, keys, batch, reads, random.Random(0))
+    mixed_rate = len(keys) / (time.perf_counter() - start)
+    return load_rate, mixed_rate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--keys', type=int, default=500000)
+    parser.add_argument('--batch', type=int, default=50000)
+    parser.add_argument('--reads', type=float, default=0.8,
+                        help='fraction of each mixed batch that is gets')
+    parser.add_argument('--map', choices=MAP_TYPES, default='sc')
+    args = parser.parse_args()
+
+    options = {'max_load': 1.0} if args.map == 'sc' else {}
+    keys = ['key' + str(i) for i in range(args.keys)]
+
+    print(f"{'setup':<16}{'load keys/s':>14}{'mixed keys/s':>14}")
+    local = MAP_TYPES[args.map](11, hash_function_fnv1a, **options)
+    load_rate, mixed_rate = measure(local, keys, args.batch, args.reads)
+    print(f"{'in process':<16}{load_rate:>14.0f}{mixed_rate:>14.0f}")
+
+    for shards in args.shards:
+        with ShardedHashMap(shards, args.map, function=hash_function_fnv1a, **options) as m:
+            load_rate, mixed_rate = measure(m, keys, args.batch, args.reads)
+        print(f"{str(shards) + ' shards':<16}{load_rate:>14.0f}{mixed_rate:>14.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
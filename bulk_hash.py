@@ -0,0 +1,199 @@
+# Course: CS261 - Data Structures
+# Description: bulk hashing for the hash maps. hashes a batch of keys and
+#              turns a batch of hashes into bucket indices with NumPy when
+#              it is installed, and one key at a time when it is not. the
+#              results are the same values the scalar functions give, so
+#              maps built either way hold their keys in the same buckets.
+
+
+from a6_include import (FNV_OFFSET_BASIS, FNV_PRIME, POLY_MODULUS, mix_hash,
+                        hash_function_1, hash_function_2, hash_function_fnv1a)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# batches smaller than this are not worth setting up the arrays for
+BULK_MIN = 1024
+
+# keys are encoded this many at a time, which bounds the size of the
+# padded arrays when a few keys are much longer than the rest
+CHUNK_SIZE = 1 << 16
+
+
+def enabled(count: int) -> bool:
+    """
+    returns True if a batch of count items takes the NumPy path
+    """
+    return numpy is not None and count >= BULK_MIN
+
+
+def _code_points(keys: list):
+    """
+    returns the keys as a 2d array of unicode code points, one row per
+    key, zero padded to the longest key
+    """
+    return numpy.array(keys, dtype=str).view(numpy.uint32).reshape(len(keys), -1)
+
+
+def _utf8_bytes(keys: list):
+    """
+    returns the UTF-8 encoded keys as a 2d array of bytes, zero padded to
+    the longest key, and the length of each key in bytes
+    """
+    encoded = [key.encode() for key in keys]
+    lengths = numpy.fromiter(map(len, encoded), dtype=numpy.intp, count=len(encoded))
+    data = numpy.array(encoded, dtype=bytes).view(numpy.uint8).reshape(len(keys), -1)
+    return data, lengths
+
+
+def _hash_1(keys: list):
+    """hash_function_1 of every key, the sum of its code points"""
+    return _code_points(keys).sum(axis=1, dtype=numpy.uint64)
+
+
+def _hash_2(keys: list):
+    """hash_function_2 of every key, code points weighted by position"""
+    codes = _code_points(keys)
+    weights = numpy.arange(1, codes.shape[1] + 1, dtype=numpy.uint64)
+    return (codes * weights).sum(axis=1, dtype=numpy.uint64)
+
+
+def _hash_fnv1a(keys: list):
+    """hash_function_fnv1a of every key, one byte column at a time"""
+    data, lengths = _utf8_bytes(keys)
+    hashes = numpy.full(len(keys), FNV_OFFSET_BASIS, dtype=numpy.uint64)
+    for column in range(data.shape[1]):
+        # uint64 arithmetic wraps around, which is the mod 2^64 FNV needs
+        mixed = (hashes ^ data[:, column]) * FNV_PRIME
+        hashes = numpy.where(column < lengths, mixed, hashes)
+    return hashes
+
+
+def _make_poly_kernel(base: int):
+    """
+    returns the vectorized form of the polynomial hash with the given base.
+    Horner's rule runs one byte column at a time. for base 256, hash * 256
+    does not fit in 64 bits, so it is split at bit 53 and the part past
+    bit 61 folds back in, since 2^61 is 1 modulo 2^61 - 1. any other base
+    is multiplied in 32 bit halves, the parts past bit 61 folding back in
+    the same way and the part past bit 64 as 2^64, which is 8
+    """
+    def hash_poly_256(keys: list):
+        """make_poly_hash(0) of every key"""
+        data, lengths = _utf8_bytes(keys)
+        hashes = numpy.zeros(len(keys), dtype=numpy.uint64)
+        for column in range(data.shape[1]):
+            shifted = (((hashes & ((1 << 53) - 1)) << 8) + (hashes >> 53)
+                       + data[:, column])
+            shifted = (shifted & POLY_MODULUS) + (shifted >> 61)
+            shifted = numpy.where(shifted >= POLY_MODULUS, shifted - POLY_MODULUS, shifted)
+            hashes = numpy.where(column < lengths, shifted, hashes)
+        return hashes
+
+    base_high, base_low = base >> 32, base & 0xFFFFFFFF
+
+    def hash_poly(keys: list):
+        """make_poly_hash of every key, for a seed that picks base"""
+        data, lengths = _utf8_bytes(keys)
+        hashes = numpy.ones(len(keys), dtype=numpy.uint64)
+        for column in range(data.shape[1]):
+            high, low = hashes >> 32, hashes & 0xFFFFFFFF
+            middle = high * base_low + low * base_high
+            bottom = low * base_low
+            product = ((high * base_high) << 3) + (middle >> 29) + ((middle & ((1 << 29) - 1)) << 32)
+            product += (bottom & POLY_MODULUS) + (bottom >> 61) + data[:, column]
+            product = (product & POLY_MODULUS) + (product >> 61)
+            product = numpy.where(product >= POLY_MODULUS, product - POLY_MODULUS, product)
+            hashes = numpy.where(column < lengths, product, hashes)
+        return hashes
+
+    return hash_poly_256 if base == 256 else hash_poly
+
+
+_KERNELS = {
+    hash_function_1: _hash_1,
+    hash_function_2: _hash_2,
+    hash_function_fnv1a: _hash_fnv1a,
+}
+
+
+def _kernel(function):
+    """
+    returns the vectorized form of a hash function, or None if it has none
+    """
+    kernel = _KERNELS.get(function)
+    if kernel is None and getattr(function, '__name__', '') == 'hash_function_poly':
+        kernel = _make_poly_kernel(function.base)
+    return kernel
+
+
+def vectorizes(function) -> bool:
+    """
+    returns True if hash_keys can hash a batch for function with NumPy
+    """
+    return numpy is not None and _kernel(function) is not None
+
+
+def hash_keys(function, keys: list) -> list:
+    """
+    returns function(key) for every key in the list. hash_function_1,
+    hash_function_2, hash_function_fnv1a and the polynomial hashes are
+    computed with NumPy for batches of BULK_MIN keys or more, as long as
+    every key is a str; anything else is hashed one key at a time
+    """
+    kernel = _kernel(function) if enabled(len(keys)) else None
+    if kernel is None or not all(type(key) is str for key in keys):
+        return [function(key) for key in keys]
+
+    hashes = []
+    for start in range(0, len(keys), CHUNK_SIZE):
+        hashes.extend(kernel(keys[start:start + CHUNK_SIZE]).tolist())
+    return hashes
+
+
+def _mix_hashes(hashes):
+    """mix_hash of every element of a uint64 array"""
+    hashes = hashes ^ (hashes >> 33)
+    hashes = hashes * 0xFF51AFD7ED558CCD
+    hashes = hashes ^ (hashes >> 33)
+    hashes = hashes * 0xC4CEB9FE1A85EC53
+    return hashes ^ (hashes >> 33)
+
+
+def bucket_indices(hashes: list, capacity: int, mask: int = 0) -> list:
+    """
+    returns the bucket index of every hash, the same as the maps'
+    _bucket_index: mix_hash(hash) & mask with a mask, hash % capacity
+    without one. done with one array operation when NumPy is installed
+    and every hash fits in 64 unsigned bits. the range is checked here
+    rather than left to NumPy, since NumPy 1.x wraps a negative hash such
+    as one from the built-in hash around to 2^64 + hash without raising,
+    and hash % capacity of that is a different bucket
+    """
+    if (not enabled(len(hashes))
+            or min(hashes) < 0 or max(hashes) > 0xFFFFFFFFFFFFFFFF):
+        if mask:
+            return [mix_hash(hash) & mask for hash in hashes]
+        return [hash % capacity for hash in hashes]
+
+    array = numpy.array(hashes, dtype=numpy.uint64)
+    if mask:
+        return (_mix_hashes(array) & mask).tolist()
+    return (array % capacity).tolist()
+
+
+def group_by_bucket(indices: list, capacity: int) -> (list, list, list):
+    """
+    returns the positions of indices ordered by bucket, the buckets that
+    have any positions and how many each of them has. positions in the
+    same bucket keep their order, so a later duplicate key still wins.
+    needs NumPy
+    """
+    array = numpy.array(indices, dtype=numpy.intp)
+    order = numpy.argsort(array, kind='stable')
+    counts = numpy.bincount(array, minlength=capacity)
+    buckets = numpy.flatnonzero(counts)
+    return order.tolist(), buckets.tolist(), counts[buckets].tolist()
@@ -0,0 +1,337 @@
+# Course: CS261 - Data Structures
+# Description: thread safe hash map built from separate chaining segments.
+#              every key belongs to one segment, a chaining HashMap with its
+#              own lock, so writers to different segments never wait on each
+#              other and every segment resizes on its own. reads take no
+#              lock unless they race a writer to the same segment.
+
+
+import threading
+from collections.abc import KeysView
+
+from a6_include import (HashMapItemsView, HashMapValuesView, as_list,
+                        next_power_of_two, hash_function_1)
+from hash_map_sc import HashMap
+
+
+# default for get that no value can be equal to
+_MISSING = object()
+
+
+class Segment:
+    """
+    one chaining HashMap with the lock its writers hold. version is odd
+    while a write is in progress and goes up by two with every write,
+    which is how a reader without the lock finds out it raced one
+    """
+
+    __slots__ = ('map', 'lock', 'version')
+
+    def __init__(self, map: HashMap) -> None:
+        self.map = map
+        self.lock = threading.Lock()
+        self.version = 0
+
+
+class ConcurrentHashMap:
+    """
+    hash map that any number of threads can use at once.
+
+    writes lock only the segment of their key and bump its version around
+    the change. get and contains_key read without a lock: they note the
+    version, look the key up and check the version did not move, which
+    means no write (a resize included) touched the segment meanwhile. if
+    one did, or one is in progress, they read again under the lock.
+
+    get_size, iteration and the views go segment by segment, so they see
+    every segment at some point but not the whole map at one instant
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 segments: int = 16,
+                 max_load: float = 1.0,
+                 **options) -> None:
+        """
+        Initialize new ConcurrentHashMap. segments is rounded up to a power
+        of two and capacity is split evenly between them. each segment is a
+        hash_map_sc.HashMap with the given function, max_load and options.
+        incremental_resize is not supported, it would have reads move nodes
+        """
+        if options.get('incremental_resize'):
+            raise ValueError("ConcurrentHashMap does not support incremental_resize")
+
+        count = next_power_of_two(segments)
+        per_segment = max(1, -(-capacity // count))
+        self._segments = [Segment(HashMap(per_segment, function, max_load=max_load, **options))
+                          for _ in range(count)]
+        self._segment_mask = count - 1
+
+    def _segment(self, key: str) -> Segment:
+        """
+        returns the segment of the key. the built in hash is only used to
+        spread keys over segments, within one the map's own function decides
+        """
+        return self._segments[hash(key) & self._segment_mask]
+
+    def _read(self, segment: Segment, method, key: str, default: object):
+        """
+        runs a reading method of the segment's map without the lock, and
+        again under it if a write ran at the same time
+        """
+        version = segment.version
+        if not version & 1:
+            try:
+                result = method(segment.map, key, default)
+            except Exception:
+                # a racing resize can leave the read looking at a half
+                # swapped table, only a clean read may raise
+                if segment.version == version:
+                    raise
+            else:
+                if segment.version == version:
+                    return result
+        with segment.lock:
+            return method(segment.map, key, default)
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        returns the value associated with the given key, or default
+        """
+        return self._read(self._segment(key), HashMap.get, key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        returns True if the key is in the hash map or False otherwise
+        """
+        return self._read(self._segment(key), _contains_key, key, None)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map, locking only its segment
+        """
+        segment = self._segment(key)
+        with segment.lock:
+            segment.version += 1
+            try:
+                segment.map.put(key, value)
+            finally:
+                segment.version += 1
+
+    def remove(self, key: str) -> None:
+        """
+        removes the key from the map, locking only its segment
+        """
+        segment = self._segment(key)
+        with segment.lock:
+            segment.version += 1
+            try:
+                segment.map.remove(key)
+            finally:
+                segment.version += 1
+
+    def put_if_absent(self, key: str, value: object) -> object:
+        """
+        puts the key and value unless the key is already in the map, as one
+        step no other thread can get between. returns the value the key had,
+        or None if it was put
+        """
+        segment = self._segment(key)
+        with segment.lock:
+            current = segment.map.get(key, _MISSING)
+            if current is not _MISSING:
+                return current
+            segment.version += 1
+            try:
+                segment.map.put(key, value)
+            finally:
+                segment.version += 1
+            return None
+
+    def _group(self, keys: list) -> list:
+        """
+        returns, per segment, the positions of the keys that belong to it
+        """
+        groups = [[] for _ in self._segments]
+        mask = self._segment_mask
+        for position, key in enumerate(keys):
+            groups[hash(key) & mask].append(position)
+        return groups
+
+    def put_many(self, pairs) -> None:
+        """
+        puts every (key, value) pair of pairs, a DynamicArray or any other
+        iterable. the pairs are grouped by segment first, so every segment
+        is locked once and sized once for its share of the batch
+        """
+        pairs = as_list(pairs)
+        groups = self._group([pair[0] for pair in pairs])
+        for segment, positions in zip(self._segments, groups):
+            if not positions:
+                continue
+            with segment.lock:
+                segment.version += 1
+                try:
+                    segment.map.put_many([pairs[position] for position in positions])
+                finally:
+                    segment.version += 1
+
+    def get_many(self, keys) -> list:
+        """
+        returns a list with the value of each key in keys (a DynamicArray
+        or any other iterable), None for the keys that are not in the map
+        """
+        get = self.get
+        return [get(key) for key in as_list(keys)]
+
+    def get_size(self) -> int:
+        """
+        Return size of map, summed segment by segment
+        """
+        return sum(segment.map.get_size() for segment in self._segments)
+
+    def get_capacity(self) -> int:
+        """
+        Return the total capacity of the segments
+        """
+        return sum(segment.map.get_capacity() for segment in self._segments)
+
+    def get_segment_count(self) -> int:
+        """
+        Return the number of segments
+        """
+        return len(self._segments)
+
+    def table_load(self) -> float:
+        """
+        number of elements divided by the total capacity
+        """
+        return self.get_size() / self.get_capacity()
+
+    def clear(self) -> None:
+        """
+        empties every segment, holding all their locks at once so no write
+        lands in a segment that was already cleared
+        """
+        for segment in self._segments:
+            segment.lock.acquire()
+        try:
+            for segment in self._segments:
+                segment.version += 1
+                segment.map.clear()
+                segment.version += 1
+        finally:
+            for segment in self._segments:
+                segment.lock.release()
+
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        """
+        returns the number of keys in the map
+        """
+        return self.get_size()
+
+    def __contains__(self, key: str) -> bool:
+        """
+        returns True if the key is in the map, see contains_key
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        returns the value of the key, raises KeyError if it is not in the map
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map, see put
+        """
+        self.put(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        """
+        removes the key, raises KeyError if it is not in the map
+        """
+        segment = self._segment(key)
+        with segment.lock:
+            size = segment.map.get_size()
+            segment.version += 1
+            try:
+                segment.map.remove(key)
+            finally:
+                segment.version += 1
+            if segment.map.get_size() == size:
+                raise KeyError(key)
+
+    def _iter_items(self):
+        """
+        yields every (key, value) pair, copying one segment at a time
+        under its lock so other threads can keep writing meanwhile
+        """
+        for segment in self._segments:
+            with segment.lock:
+                items = list(segment.map.items())
+            yield from items
+
+    def __iter__(self):
+        """
+        yields every key, see _iter_items
+        """
+        for key, _ in self._iter_items():
+            yield key
+
+    def keys(self) -> KeysView:
+        """
+        returns a view of the keys, iterated segment by segment
+        """
+        return KeysView(self)
+
+    def values(self) -> HashMapValuesView:
+        """
+        returns a view of the values, iterated segment by segment
+        """
+        return HashMapValuesView(self)
+
+    def items(self) -> HashMapItemsView:
+        """
+        returns a view of the (key, value) pairs, iterated segment by segment
+        """
+        return HashMapItemsView(self)
+
+
+def _contains_key(map: HashMap, key: str, default: object) -> bool:
+    """contains_key with the signature ConcurrentHashMap._read calls"""
+    return map.contains_key(key)
+
+
+if __name__ == "__main__":
+
+    print("\nconcurrent map example")
+    print("----------------------")
+    # every thread puts its own keys and removes half of them again, so
+    # the end result is the same however the threads interleave
+    m = ConcurrentHashMap(11, segments=4)
+
+    def work(thread: int) -> None:
+        for i in range(1000):
+            m.put(f'{thread}-{i}', i)
+        for i in range(0, 1000, 2):
+            m.remove(f'{thread}-{i}')
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = {f'{thread}-{i}': i for thread in range(4) for i in range(1, 1000, 2)}
+    print(len(m), m.get_segment_count(), dict(m.items()) == expected)
+    print(all(m.get(key) == value for key, value in expected.items()))
+    print(m.get('0-0'), m.contains_key('0-0'), m.contains_key('0-1'))
+    print(m.put_if_absent('0-1', -1), m.put_if_absent('new', -1), m['new'])
@@ -0,0 +1,370 @@
+# Course: CS261 - Data Structures
+# Description: read only open addressing hash map kept in a memory mapped
+#              file. build writes the file once from an existing map, then
+#              any number of processes open it and look keys up straight
+#              in the mapped pages, which the OS shares between them.
+#
+#              file layout, all integers little endian:
+#                header    magic 'HMFZ', u16 version, u8 flags, pad byte,
+#                          u64 capacity, u64 size, u64 slot array offset,
+#                          u64 seed, then the hash function's qualified
+#                          name as u16 length + UTF-8 text
+#                slots     capacity slots of u64 hash, u64 key offset,
+#                          u64 value offset; EMPTY as the key offset marks
+#                          an empty slot. capacity is a power of two, at
+#                          least twice the size, probed linearly from
+#                          mix_hash(hash) & (capacity - 1)
+#                keys      u32 length + UTF-8 key, one after the other
+#                values    u32 length + pickled value, one after the other
+
+
+import mmap
+import pickle
+import struct
+from collections.abc import KeysView
+
+import bulk_hash
+import hash_map_io
+from a6_include import (HashMapItemsView, HashMapValuesView, as_list,
+                        mix_hash, next_power_of_two, hash_function_fnv1a)
+
+
+MAGIC = b'HMFZ'
+VERSION = 1
+
+# header flags
+HAS_SEED = 1
+
+# key offset of an empty slot
+EMPTY = 0xFFFFFFFFFFFFFFFF
+
+_HEADER = struct.Struct('<4sHBxQQQQ')
+_STRING_LENGTH = struct.Struct('<H')
+_SLOT = struct.Struct('<QQQ')
+_LENGTH = struct.Struct('<I')
+
+# default for get that no value can be equal to
+_MISSING = object()
+
+
+def _align(offset: int) -> int:
+    """rounds an offset up to a multiple of 8"""
+    return (offset + 7) & ~7
+
+
+class FrozenHashMap:
+    """
+    read only hash map over a file written by FrozenHashMap.build. lookups
+    run on a memoryview of the mapped file: the probe reads the slot array
+    and compares the key bytes in place, only the value of a hit is
+    unpickled. supports get, contains_key and the read only half of the
+    mapping protocol. pickling one only pickles the path, so it can be
+    handed to worker processes that map the same file
+    """
+
+    def __init__(self, path: str, function=None) -> None:
+        """
+        maps the file at path. function defaults to the hash function the
+        file was built with, it has to be passed in when hash_map_io can't
+        recreate it
+        """
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._path = path
+        self._buffer = memoryview(self._mmap)
+        try:
+            self._read_header(function)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self, function) -> None:
+        """
+        checks the header of the mapped file and sets the map up from it
+        """
+        buffer = self._buffer
+        if len(buffer) < _HEADER.size:
+            raise ValueError("not a frozen hash map file")
+        magic, version, flags, capacity, size, slots, seed = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("not a frozen hash map file")
+        if version > VERSION:
+            raise ValueError(f"unsupported frozen hash map version: {version}")
+
+        length = _STRING_LENGTH.unpack_from(buffer, _HEADER.size)[0]
+        start = _HEADER.size + _STRING_LENGTH.size
+        identity = (str(buffer[start:start + length], 'utf-8'),
+                    seed if flags & HAS_SEED else None)
+        if function is None:
+            function = hash_map_io.function_from_identity(identity)
+        elif hash_map_io.function_identity(function) != identity:
+            raise ValueError("function is not the hash function the file was built with")
+
+        self._hash_function = function
+        self._capacity = capacity
+        self._mask = capacity - 1
+        self._size = size
+        self._slots = slots
+
+    @classmethod
+    def build(cls, source, path: str, function=hash_function_fnv1a) -> "FrozenHashMap":
+        """
+        writes the entries of source to a frozen map file at path and
+        returns the map opened on it. source is a map or dict with items(),
+        or any iterable of (key, value) pairs, where a later pair wins.
+        keys have to be str and values are pickled. function has to give
+        the same hashes in every process, see hash_map_io.function_identity
+        """
+        identity = hash_map_io.function_identity(function)
+        if identity is None:
+            raise ValueError("a frozen map needs a hash function every process agrees on")
+        name, seed = identity
+
+        pairs = source.items() if hasattr(source, 'items') else as_list(source)
+        entries = dict(pairs)
+        keys = list(entries)
+        for key in keys:
+            if not isinstance(key, str):
+                raise TypeError(f"only str keys can be frozen, not {type(key).__name__}")
+
+        capacity = next_power_of_two(2 * len(keys))
+        hashes = bulk_hash.hash_keys(function, keys)
+        indices = bulk_hash.bucket_indices(hashes, capacity, capacity - 1)
+
+        # linear probing into a plain list of positions in keys
+        table = [-1] * capacity
+        for position, index in enumerate(indices):
+            while table[index] != -1:
+                index = (index + 1) & (capacity - 1)
+            table[index] = position
+
+        name = name.encode()
+        slots = _align(_HEADER.size + _STRING_LENGTH.size + len(name))
+        key_heap = slots + capacity * _SLOT.size
+
+        key_offsets, key_parts, offset = [], [], key_heap
+        for key in keys:
+            data = key.encode()
+            key_offsets.append(offset)
+            key_parts.append(_LENGTH.pack(len(data)))
+            key_parts.append(data)
+            offset += _LENGTH.size + len(data)
+
+        value_offsets, value_parts = [], []
+        for key in keys:
+            data = pickle.dumps(entries[key], pickle.HIGHEST_PROTOCOL)
+            value_offsets.append(offset)
+            value_parts.append(_LENGTH.pack(len(data)))
+            value_parts.append(data)
+            offset += _LENGTH.size + len(data)
+
+        slot_array = bytearray(capacity * _SLOT.size)
+        pack_slot = _SLOT.pack_into
+        for index, position in enumerate(table):
+            if position == -1:
+                pack_slot(slot_array, index * _SLOT.size, 0, EMPTY, 0)
+            else:
+                pack_slot(slot_array, index * _SLOT.size, hashes[position],
+                          key_offsets[position], value_offsets[position])
+
+        flags = HAS_SEED if seed is not None else 0
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, flags, capacity, len(keys),
+                                    slots, seed or 0))
+            file.write(_STRING_LENGTH.pack(len(name)))
+            file.write(name)
+            file.write(bytes(slots - file.tell()))
+            file.write(slot_array)
+            file.write(b''.join(key_parts))
+            file.write(b''.join(value_parts))
+
+        return cls(path, function)
+
+    def close(self) -> None:
+        """
+        unmaps the file. the map can't be used afterwards. an unfinished
+        iteration over the map holds a view of the file that keeps it
+        mapped: close then raises BufferError and leaves the map open, to
+        be closed again once the iteration is done or dropped
+        """
+        if self._mmap.closed:
+            return
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            self._buffer = memoryview(self._mmap)
+            raise
+
+    def __enter__(self) -> "FrozenHashMap":
+        """
+        returns the map, which is closed at the end of the with block
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        closes the map
+        """
+        self.close()
+
+    def __reduce__(self):
+        """
+        pickles the map as its path, the receiving process maps the file.
+        the hash function goes along only when the file can't name it
+        """
+        function = self._hash_function
+        try:
+            hash_map_io.function_from_identity(hash_map_io.function_identity(function))
+            function = None
+        except ValueError:
+            pass
+        return FrozenHashMap, (self._path, function)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def _find(self, key: str) -> int:
+        """
+        returns the value offset of the key, or -1 if it is not in the map.
+        only the slot array and the bytes of keys whose hash matches are
+        read, the key is compared in place
+        """
+        buffer, slots = self._buffer, self._slots
+        data = key.encode()
+        hash = self._hash_function(key)
+        index = mix_hash(hash) & self._mask
+        unpack_slot, unpack_length = _SLOT.unpack_from, _LENGTH.unpack_from
+
+        while True:
+            slot_hash, key_offset, value_offset = unpack_slot(buffer, slots + index * _SLOT.size)
+            if key_offset == EMPTY:
+                return -1
+            if slot_hash == hash:
+                start = key_offset + _LENGTH.size
+                if (unpack_length(buffer, key_offset)[0] == len(data)
+                        and buffer[start:start + len(data)] == data):
+                    return value_offset
+            index = (index + 1) & self._mask
+
+    def _value(self, offset: int) -> object:
+        """unpickles the value stored at offset"""
+        start = offset + _LENGTH.size
+        end = start + _LENGTH.unpack_from(self._buffer, offset)[0]
+        return pickle.loads(self._buffer[start:end])
+
+    def _key(self, offset: int) -> str:
+        """decodes the key stored at offset"""
+        start = offset + _LENGTH.size
+        end = start + _LENGTH.unpack_from(self._buffer, offset)[0]
+        return str(self._buffer[start:end], 'utf-8')
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        returns the value associated with the given key, or default
+        """
+        offset = self._find(key)
+        if offset == -1:
+            return default
+        return self._value(offset)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        returns True if the key is in the hash map or False otherwise
+        """
+        return self._find(key) != -1
+
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        """
+        returns the number of keys in the map
+        """
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        """
+        returns True if the key is in the map, see contains_key
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        returns the value of the key, raises KeyError if it is not in the map
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def _iter_slots(self):
+        """
+        yields the key and value offsets of every full slot
+        """
+        for _, key_offset, value_offset in _SLOT.iter_unpack(
+                self._buffer[self._slots:self._slots + self._capacity * _SLOT.size]):
+            if key_offset != EMPTY:
+                yield key_offset, value_offset
+
+    def __iter__(self):
+        """
+        yields every key, in slot order
+        """
+        for key_offset, _ in self._iter_slots():
+            yield self._key(key_offset)
+
+    def _iter_items(self):
+        """
+        yields every (key, value) pair, in slot order
+        """
+        for key_offset, value_offset in self._iter_slots():
+            yield self._key(key_offset), self._value(value_offset)
+
+    def keys(self) -> KeysView:
+        """
+        returns a view of the keys that reads the file as it is iterated
+        """
+        return KeysView(self)
+
+    def values(self) -> HashMapValuesView:
+        """
+        returns a view of the values that reads the file as it is iterated
+        """
+        return HashMapValuesView(self)
+
+    def items(self) -> HashMapItemsView:
+        """
+        returns a view of the (key, value) pairs that reads the file as it
+        is iterated
+        """
+        return HashMapItemsView(self)
+
+
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+
+    print("\nfrozen map example")
+    print("------------------")
+    source = {'key' + str(i): [i, str(i)] for i in range(100)}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.bin')
+        with FrozenHashMap.build(source, path) as m:
+            print(len(m), m.get_capacity(), m['key7'], m.get('missing'), 'key7' in m)
+            print(all(m.get(key) == value for key, value in source.items()))
+            print(dict(m.items()) == source)
+
+            # a pickled map is its path, the copy maps the same file
+            copy = pickle.loads(pickle.dumps(m))
+            print(dict(copy.items()) == source)
+            copy.close()
@@ -0,0 +1,251 @@
+# Course: CS261 - Data Structures
+# Description: snapshot files for the hash maps. a snapshot is a versioned
+#              binary file holding the capacity, the table layout, the
+#              identity of the hash function and every entry with its slot
+#              and cached hash, so a map loaded with the same function and
+#              layout puts each entry straight back without hashing or
+#              probing. the maps' save and load methods use this module.
+#
+#              file layout, all integers little endian:
+#                header    magic 'HMAP', u16 version, u8 flags,
+#                          u64 capacity, u64 size
+#                layout    u16 length + UTF-8 text, empty if unknown
+#                function  u16 length + UTF-8 text, empty if unknown,
+#                          then a u64 seed when the flags say so
+#                entries   u64 slot, u64 hash, u32 key length + UTF-8 key,
+#                          u32 value length + pickled value. a tombstone is
+#                          a slot with key length 0xFFFFFFFF and no more
+
+
+import pickle
+import struct
+
+from a6_include import (chunked, make_poly_hash, hash_function_1,
+                        hash_function_2, hash_function_builtin,
+                        hash_function_fnv1a)
+
+
+MAGIC = b'HMAP'
+VERSION = 1
+
+# header flags
+HAS_HASHES = 1
+HAS_SEED = 2
+
+TOMBSTONE_LENGTH = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sHBQQ')
+_STRING_LENGTH = struct.Struct('<H')
+_SEED = struct.Struct('<Q')
+_RECORD = struct.Struct('<QQI')
+_LENGTH = struct.Struct('<I')
+
+# entries are encoded and written this many at a time
+WRITE_CHUNK = 4096
+
+
+def _name(function) -> str:
+    """returns the module qualified name of a function"""
+    return f"{function.__module__}.{function.__qualname__}"
+
+
+# hash functions load can recreate from their identity alone
+_FUNCTIONS = {_name(function): function
+              for function in (hash_function_1, hash_function_2, hash_function_fnv1a)}
+_POLY_NAME = _name(make_poly_hash(0))
+
+
+def function_identity(function) -> (str, int):
+    """
+    returns (name, seed) identifying the hash function across processes,
+    seed is None for unseeded functions. returns None for functions whose
+    values can't be reproduced in another process: the built in hash is
+    randomized per process, and lambdas and closures other than the
+    seeded polynomial hash (SipHash has a secret key) can't be told apart
+    """
+    if function is hash or function is hash_function_builtin:
+        return None
+    name = getattr(function, '__qualname__', None)
+    seed = getattr(function, 'seed', None)
+    if name is None or '<lambda>' in name or ('<locals>' in name and seed is None):
+        return None
+    return _name(function), seed
+
+
+def function_from_identity(identity: (str, int)):
+    """
+    returns the hash function with the identity function_identity gave,
+    raises ValueError if it is not one this module can recreate
+    """
+    if identity is not None:
+        name, seed = identity
+        if name in _FUNCTIONS:
+            return _FUNCTIONS[name]
+        if name == _POLY_NAME:
+            return make_poly_hash(seed)
+    raise ValueError("the hash function can't be recreated, pass it in")
+
+
+def portable_function(function):
+    """
+    returns what to hand another process so resolve_function can give it
+    the same hash function: its identity when function_from_identity can
+    recreate it from that, otherwise the function itself, which then has
+    to pickle
+    """
+    identity = function_identity(function)
+    try:
+        function_from_identity(identity)
+    except ValueError:
+        return function
+    return identity
+
+
+def resolve_function(portable):
+    """
+    returns the hash function portable_function described
+    """
+    if isinstance(portable, tuple):
+        return function_from_identity(portable)
+    return portable
+
+
+def _write_string(file, text: str) -> None:
+    """writes a u16 length prefixed UTF-8 string, empty for None"""
+    data = (text or '').encode()
+    file.write(_STRING_LENGTH.pack(len(data)))
+    file.write(data)
+
+
+def write_snapshot(path: str, capacity: int, layout: str, function,
+                   size: int, records) -> None:
+    """
+    writes a snapshot of a map to path. layout names how entries are
+    placed in the table (None if it can't be reproduced) and records
+    yields (slot, hash, key, value) for every entry, with a key of None
+    for a tombstone. keys have to be str, values are pickled. the hashes
+    are kept only when the function can be identified and every hash
+    fits in 64 unsigned bits
+    """
+    identity = function_identity(function)
+    flags = 0
+    if identity is not None:
+        flags |= HAS_HASHES
+        if identity[1] is not None:
+            flags |= HAS_SEED
+
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, flags, capacity, size))
+        _write_string(file, layout)
+        _write_string(file, identity and identity[0])
+        if flags & HAS_SEED:
+            file.write(_SEED.pack(identity[1]))
+
+        hashes_fit = True
+        for chunk in chunked(records, WRITE_CHUNK):
+            out = []
+            for slot, hash, key, value in chunk:
+                if key is None:
+                    out.append(_RECORD.pack(slot, 0, TOMBSTONE_LENGTH))
+                    continue
+                if not isinstance(key, str):
+                    raise TypeError(f"only str keys can be saved, not {type(key).__name__}")
+                if not 0 <= hash <= 0xFFFFFFFFFFFFFFFF:
+                    hashes_fit = False
+                    hash = 0
+                key = key.encode()
+                value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                out.append(_RECORD.pack(slot, hash, len(key)))
+                out.append(key)
+                out.append(_LENGTH.pack(len(value)))
+                out.append(value)
+            file.write(b''.join(out))
+
+        if flags & HAS_HASHES and not hashes_fit:
+            file.seek(0)
+            file.write(_HEADER.pack(MAGIC, VERSION, flags & ~HAS_HASHES, capacity, size))
+
+
+class Snapshot:
+    """
+    a snapshot file read back into memory, see read_snapshot
+    """
+
+    def __init__(self, data: bytes) -> None:
+        """
+        parses the header of the snapshot in data, raises ValueError if it
+        is not a snapshot this version can read
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("not a hash map snapshot")
+        magic, version, flags, self.capacity, self.size = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a hash map snapshot")
+        if version > VERSION:
+            raise ValueError(f"unsupported snapshot version: {version}")
+
+        self._data = memoryview(data)
+        self._offset = _HEADER.size
+        self.layout = self._read_string()
+        name = self._read_string()
+        seed = None
+        if flags & HAS_SEED:
+            seed = _SEED.unpack_from(data, self._offset)[0]
+            self._offset += _SEED.size
+        self.identity = (name, seed) if name else None
+        self.has_hashes = bool(flags & HAS_HASHES)
+
+    def _read_string(self) -> str:
+        """reads a u16 length prefixed UTF-8 string, None if it is empty"""
+        length = _STRING_LENGTH.unpack_from(self._data, self._offset)[0]
+        start = self._offset + _STRING_LENGTH.size
+        self._offset = start + length
+        return str(self._data[start:self._offset], 'utf-8') or None
+
+    def function(self):
+        """
+        returns the hash function the map was saved with, raises ValueError
+        if it is not one this module can recreate
+        """
+        return function_from_identity(self.identity)
+
+    def matches(self, function, capacity: int, layout: str) -> bool:
+        """
+        returns True if a map with this function, capacity and layout
+        places every entry in the slot it was saved from
+        """
+        return (self.has_hashes and layout is not None and layout == self.layout
+                and capacity == self.capacity
+                and function_identity(function) == self.identity)
+
+    def records(self):
+        """
+        yields (slot, hash, key, value) for every saved entry, with a key
+        of None for a tombstone
+        """
+        data, offset = self._data, self._offset
+        unpack_record, unpack_length = _RECORD.unpack_from, _LENGTH.unpack_from
+        loads = pickle.loads
+        end = len(data)
+        while offset < end:
+            slot, hash, length = unpack_record(data, offset)
+            offset += _RECORD.size
+            if length == TOMBSTONE_LENGTH:
+                yield slot, None, None, None
+                continue
+            key = str(data[offset:offset + length], 'utf-8')
+            offset += length
+            length = unpack_length(data, offset)[0]
+            offset += _LENGTH.size
+            value = loads(data[offset:offset + length])
+            offset += length
+            yield slot, hash, key, value
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    reads the snapshot at path in one go. the values are unpickled, so
+    only load snapshots from a trusted source
+    """
+    with open(path, 'rb') as file:
+        return Snapshot(file.read())
@@ -6,69 +6,141 @@
 # Description: hash map implementation with open addressing for collisions
 
 
-from a6_include import (DynamicArray, HashEntry,
-                        hash_function_1, hash_function_2)
+from array import array
+from collections.abc import KeysView
+from itertools import repeat
+
+import bulk_hash
+import hash_map_io
+from a6_include import (DynamicArray, HashEntry, HashMapItemsView,
+                        HashMapValuesView, as_list, chunked, is_prime,
+                        make_keyed_hash, mix_hash, next_power_of_two,
+                        next_prime, hash_function_1, hash_function_2)
+
+
+# default for get that no value can be equal to
+_MISSING = object()
+
+# how much the probe step grows after every probe, per probing strategy.
+# the step starts at 1 (or at the second hash for double hashing) so
+# linear probes +1 each time, quadratic walks the squares 1, 4, 9, ...
+# and triangular walks 1, 3, 6, ... which covers every slot of a
+# power of two table
+PROBE_DELTAS = {
+    'linear': 0,
+    'quadratic': 2,
+    'triangular': 1,
+    'double': 0,
+    'robin_hood': 0,
+}
+
+# an incremental resize allocates its new table this many times faster
+# than it then drains the old one, so the old table has filled up very
+# little by the time the new one is ready
+ALLOCATION_RATE = 4
+
+# left in the slots of a table being drained once their entries have
+# moved, so the entries are let go of along the way and not all at once
+# with the table. being a tombstone it keeps probes going past it
+_MOVED = HashEntry(None, None)
+_MOVED.is_tombstone = True
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    def __init__(self, capacity: int, function,
+                 max_tombstone_ratio: float = 0.25,
+                 probing: str = 'quadratic',
+                 function_2=None,
+                 capacity_policy: str = 'prime',
+                 incremental_resize: bool = False,
+                 rehash_step: int = 16,
+                 hardened: bool = False,
+                 max_probe: int = 32) -> None:
         """
         Initialize new HashMap that uses
-        quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        open addressing for collision resolution.
+        probing is one of 'linear', 'quadratic', 'triangular', 'double'
+        or 'robin_hood'. double hashing takes its step from function_2 when
+        given, otherwise from the upper part of the first hash.
+        robin hood uses linear probing with backward shift deletion and
+        never leaves tombstones.
+        capacity_policy is 'prime' or 'power_of_two'. power of two tables
+        index with a bitmask over a mixed hash, and quadratic probing
+        on them walks the triangular numbers so every slot is reached.
+        once tombstones take up more than max_tombstone_ratio of the table
+        it is rehashed in place to clear them out.
+        with incremental_resize the automatic growth in put and the
+        tombstone purge in remove are spread over the puts, gets,
+        contains_keys and removes that follow: each of them allocates a
+        slice of the new table or, once it is complete, moves rehash_step
+        slots of the old one across. the old table stays readable until
+        it is drained.
+        hardened is for keys from untrusted sources: function is replaced by
+        SipHash under a random per map key, and a put whose probe visits
+        more than max_probe slots reseeds the hash and rehashes the table
         """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        if probing not in PROBE_DELTAS:
+            raise ValueError(f"unknown probing strategy: {probing}")
+        if capacity_policy not in ('prime', 'power_of_two'):
+            raise ValueError(f"unknown capacity policy: {capacity_policy}")
+
+        self._power_of_two = capacity_policy == 'power_of_two'
+        if self._power_of_two:
+            self._allocate(next_power_of_two(capacity))
+        else:
+            # capacity must be a prime number
+            self._allocate(self._next_prime(capacity))
 
-        self._hash_function = function
+        self._hash_function = make_keyed_hash() if hardened else function
         self._size = 0
+        self._max_tombstone_ratio = max_tombstone_ratio
+
+        self._probing = probing
+        self._probe_delta = PROBE_DELTAS[probing]
+        if probing == 'quadratic' and self._power_of_two:
+            self._probe_delta = PROBE_DELTAS['triangular']
+        self._double_hash = probing == 'double'
+        self._robin_hood = probing == 'robin_hood'
+        self._hash_function_2 = function_2
+
+        self._incremental = incremental_resize
+        self._rehash_step = rehash_step
+        # True from the start of an incremental resize until its old table
+        # is drained. the new table is allocated into _new_buckets first,
+        # then the old one is moved to _old_buckets and drained
+        self._migrating = False
+        self._new_buckets = None
+        self._new_capacity = 0
+        self._old_buckets = None
+        self._migrate_index = 0
+
+        self._hardened = hardened
+        self._max_probe = max_probe
+        self._reseed_count = 0
+        # slots visited by the last _find_slot
+        self._probe_count = 0
 
     def __str__(self) -> str:
         """
-        Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Override string method to provide more readable output.
+        the lines are joined once at the end, adding them to a string
+        one by one copies everything built so far every time
         """
-        out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
-        return out
+        return ''.join([str(i) + ': ' + str(bucket) + '\n'
+                        for i, bucket in enumerate(self._buckets)])
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Find the closest prime number from the precomputed prime table
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return is_prime(capacity)
 
     def get_size(self) -> int:
         """
@@ -84,43 +156,234 @@ class HashMap:
         """
         return self._capacity
 
+    def get_reseed_count(self) -> int:
+        """
+        Return how many times a hardened map has picked a new hash key
+        """
+        return self._reseed_count
+
+    def is_incremental(self) -> bool:
+        """
+        Return True if the map was built with incremental_resize
+        """
+        return self._incremental
+
+    def migration_pending(self) -> bool:
+        """
+        Return True while an incremental resize is under way
+        """
+        return self._migrating
+
+    def migrate_step(self, count: int) -> None:
+        """
+        does count slots worth of the incremental resize under way, if any,
+        the work a put or get does along the way with count = rehash_step
+        """
+        if self._migrating:
+            self._migrate(count)
+
     # ------------------------------------------------------------------ #
 
+    def _allocate(self, capacity: int) -> None:
+        """
+        points the map at a new empty table of exactly capacity slots
+        """
+        self._use_table(DynamicArray([None] * capacity))
+
+    def _use_table(self, buckets: DynamicArray) -> None:
+        """
+        points the map at buckets, an empty table
+        """
+        self._capacity = buckets.length()
+        self._mask = self._capacity - 1 if self._power_of_two else 0
+        self._buckets = buckets
+        self._tombstones = 0
+
+    def _bucket_index(self, hash: int, capacity: int = 0) -> int:
+        """
+        returns the home slot for a hash, in the current table
+        unless the capacity of another table is given
+        """
+        if capacity:
+            mask = capacity - 1 if self._power_of_two else 0
+        else:
+            capacity, mask = self._capacity, self._mask
+        if mask:
+            return mix_hash(hash) & mask
+        return hash % capacity
+
+    def _probe_step(self, key: str, hash: int, capacity: int = 0) -> int:
+        """
+        returns the first step of the probe sequence for the key, in the
+        current table unless the capacity of another table is given
+        """
+        if not self._double_hash:
+            return 1
+        capacity = capacity or self._capacity
+        if self._hash_function_2 is not None:
+            second = self._hash_function_2(key)
+        else:
+            second = hash // capacity
+        if self._power_of_two:
+            # any odd step reaches every slot of a power of two table
+            return (second & (capacity - 1)) | 1
+        # any step below a prime capacity reaches every slot
+        return 1 + second % (capacity - 1)
+
+    def _find_slot(self, key: str, hash: int) -> (int, bool):
+        """
+        runs the probe sequence for the key exactly once.
+        returns (index, True) for the slot holding the key, otherwise
+        (index, False) for the slot it should be put in: the first tombstone
+        passed or else the empty slot that ended the probe.
+        index is -1 if the probe ran out of slots without finding either
+        """
+        if self._robin_hood:
+            return self._find_slot_robin_hood(key, hash)
+
+        capacity = self._capacity
+        buckets = self._buckets
+        index = self._bucket_index(hash)
+        step = self._probe_step(key, hash)
+        delta = self._probe_delta
+        tombstone_index = -1
+
+        for probes in range(1, capacity + 1):
+            entry = buckets[index]
+            if entry is None:
+                self._probe_count = probes
+                if tombstone_index != -1:
+                    return tombstone_index, False
+                return index, False
+            if entry.is_tombstone:
+                # remember the first free slot but keep looking for the key
+                if tombstone_index == -1:
+                    tombstone_index = index
+            elif entry.hash == hash and entry.key == key:
+                self._probe_count = probes
+                return index, True
+            index = (index + step) % capacity
+            step += delta
+        self._probe_count = capacity
+        return tombstone_index, False
+
+    def _probe_distance(self, index: int) -> int:
+        """
+        returns how far the entry at index sits from its home slot
+        """
+        home = self._bucket_index(self._buckets[index].hash)
+        return (index - home) % self._capacity
+
+    def _find_slot_robin_hood(self, key: str, hash: int) -> (int, bool):
+        """
+        robin hood version of _find_slot. the probe stops early at the
+        first entry that is closer to its home than the key would be,
+        since the key would have displaced it on insert
+        """
+        capacity = self._capacity
+        buckets = self._buckets
+        index = self._bucket_index(hash)
+
+        for distance in range(capacity):
+            entry = buckets[index]
+            self._probe_count = distance + 1
+            if entry is None or self._probe_distance(index) < distance:
+                return index, False
+            if entry.hash == hash and entry.key == key:
+                return index, True
+            index = (index + 1) % capacity
+        return -1, False
+
+    def _insert_robin_hood(self, index: int, entry: HashEntry) -> None:
+        """
+        places the entry at index, the slot returned by _find_slot_robin_hood,
+        and shifts richer entries further down the probe sequence
+        """
+        capacity = self._capacity
+        home = self._bucket_index(entry.hash)
+        distance = (index - home) % capacity
+
+        while self._buckets[index] is not None:
+            resident_distance = self._probe_distance(index)
+            if resident_distance < distance:
+                # take the slot from the richer entry and carry it on
+                resident = self._buckets[index]
+                self._buckets.set_at_index(index, entry)
+                entry, distance = resident, resident_distance
+            index = (index + 1) % capacity
+            distance += 1
+        self._buckets.set_at_index(index, entry)
+
+    def _delete_robin_hood(self, index: int) -> None:
+        """
+        removes the entry at index and shifts the following entries of the
+        cluster back by one slot so that no tombstone is needed
+        """
+        # the entry may still sit in a table being drained by an
+        # incremental resize, flag it so it is not found there
+        self._buckets[index].is_tombstone = True
+
+        capacity = self._capacity
+        following = (index + 1) % capacity
+        while (self._buckets[following] is not None
+               and self._probe_distance(following) > 0):
+            self._buckets.set_at_index(index, self._buckets[following])
+            index, following = following, (following + 1) % capacity
+        self._buckets.set_at_index(index, None)
+
     def put(self, key: str, value: object) -> None:
         """
-        puts a new hash entry into the hash map with quadratic probing
-        to find a spot for it
+        puts a new hash entry into the hash map, probing
+        to find a spot for it. the first tombstone passed on the way is
+        reused, the probe only keeps going to rule out a duplicate key
         """
+        if self._migrating:
+            self._migrate(self._rehash_step)
+
         # remember, if the load factor is greater than or equal to 0.5,
         # resize the table before putting the new key/value pair
         if self.table_load() >= .5:
-            self.resize_table(2 * self._capacity)
+            if self._incremental:
+                self._start_migration(2 * self._capacity)
+            else:
+                self.resize_table(2 * self._capacity)
 
-        element = HashEntry(key, value)
-        hash = self._hash_function(key)
-        index = hash % self._capacity
-        initial_index = index
+        self._put(key, value, self._hash_function(key))
 
-        j = 1
-        while self._buckets[index] is not None:
-            # check for key and tombstone first
-            if self._buckets[index].key == key:
-                if self._buckets[index].is_tombstone is False:
-                    # replace value
-                    self._buckets[index].value = value
-                    return
-                else:
-                    self._buckets.set_at_index(index, element)
-                    self._size += 1
-                    return
-            else:
-                # quadratic probing to find the spot
-                index = (initial_index + j ** 2) % self._capacity
-                j += 1
+    def _put(self, key: str, value: object, hash: int) -> None:
+        """
+        puts the key, with its hash already computed, once put has made
+        sure the table has room for it
+        """
+        index, found = self._find_slot(key, hash)
+        if found:
+            # replace value
+            self._buckets[index].value = value
+            return
+
+        if self._old_buckets is not None:
+            entry = self._find_old_entry(key, hash)
+            if entry is not None:
+                # not migrated yet, the entry moves over with the new value
+                entry.value = value
+                return
+
+        if index == -1:
+            # the probe sequence ran out of slots, grow and try again
+            self.resize_table(2 * self._capacity)
+            self.put(key, value)
+            return
 
-        if self._buckets[index] is None:
-            self._buckets.set_at_index(index, element)
-            self._size += 1
+        if self._robin_hood:
+            self._insert_robin_hood(index, HashEntry(key, value, hash))
+        else:
+            if self._buckets[index] is not None:
+                self._tombstones -= 1
+            self._buckets.set_at_index(index, HashEntry(key, value, hash))
+        self._size += 1
+
+        if self._hardened and self._probe_count > self._max_probe:
+            self._reseed()
 
     def table_load(self) -> float:
         """
@@ -132,6 +395,7 @@ class HashMap:
         """
         counts the empty buckets and tombstones
         """
+        self._finish_migration()
         count = 0
         for i in range(self._capacity):
             if self._buckets[i] is None or self._buckets[i].is_tombstone is True:
@@ -140,59 +404,204 @@ class HashMap:
 
     def resize_table(self, new_capacity: int) -> None:
         """
-        resizes the table to the next prime of new capacity
-        and rehashes the non-deleted entries
+        resizes the table to the next prime (or power of two) of new capacity
+        and rehashes the non-deleted entries.
+        the table keeps doubling past new_capacity for as long as putting
+        the entries back one by one would have made it grow
         """
-        # remember to rehash non-deleted entries into new table
-        old_capacity = self._capacity
+        if new_capacity < self._size:
+            return
+        self._finish_migration()
 
-        # copy the old values
-        temp = DynamicArray()
-        for i in range(old_capacity):
-            temp.append(self._buckets[i])
+        capacity = self._table_size(new_capacity)
+        while self._size and 2 * (self._size - 1) >= capacity:
+            capacity = self._table_size(2 * capacity)
+        self._rehash(capacity)
 
-        if new_capacity < self._size:
+    def _table_size(self, capacity: int) -> int:
+        """
+        returns the table size the capacity policy picks for a capacity
+        """
+        if self._power_of_two:
+            return next_power_of_two(capacity)
+        return self._next_prime(capacity)
+
+    def _rehash(self, capacity: int) -> None:
+        """
+        moves every live entry into a new table of exactly capacity slots.
+        the entries are unique and the table is big enough, so there is
+        no load check and no key comparison. tombstones are left behind
+        """
+        old_buckets = self._buckets
+        self._allocate(capacity)
+
+        if not bulk_hash.enabled(self._size):
+            # move the entries straight across, no list of them is built
+            for entry in old_buckets:
+                if entry is not None and entry.is_tombstone is False:
+                    self._place_entry(entry, self._bucket_index(entry.hash))
             return
 
-        # check for prime
-        if self._is_prime(new_capacity):
-            self._capacity = new_capacity
-        else:
-            self._capacity = self._next_prime(new_capacity)
+        entries = []
+        for i in range(old_buckets.length()):
+            entry = old_buckets[i]
+            if entry is not None and entry.is_tombstone is False:
+                entries.append(entry)
+
+        # the home slots of a big table are worked out in one go
+        indices = bulk_hash.bucket_indices([entry.hash for entry in entries],
+                                           self._capacity, self._mask)
+        for entry, index in zip(entries, indices):
+            self._place_entry(entry, index)
 
-        # make a new array with the new capacity for buckets
-        # and append None to all elements
-        self._buckets = DynamicArray()
+    def _place_entry(self, entry: HashEntry, index: int) -> None:
+        """
+        puts an entry whose key is known to be absent into the first
+        free slot of its probe sequence, which starts at index
+        """
+        if self._robin_hood:
+            self._insert_robin_hood(index, entry)
+            return
+
+        capacity = self._capacity
+        step = self._probe_step(entry.key, entry.hash)
+        delta = self._probe_delta
+        while self._buckets[index] is not None:
+            index = (index + step) % capacity
+            step += delta
+        self._buckets[index] = entry
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        starts an incremental resize, which _migrate carries out: first
+        the new table is allocated a slice at a time while the current one
+        keeps taking entries, then the current one is drained into it.
+        entries are moved by reference and the slots they leave are only
+        marked _MOVED, so the old table stays searchable until it is dropped
+        """
+        capacity = self._table_size(new_capacity)
+        if self._new_buckets is not None and capacity == self._new_capacity:
+            # already being allocated
+            return
+        if self._new_buckets is None:
+            self._finish_migration()
+        self._migrating = True
+        self._new_buckets = DynamicArray()
+        self._new_capacity = capacity
+
+    def _migrate(self, count: int) -> None:
+        """
+        does count slots worth of an incremental resize: allocates the
+        next part of the new table, sized so it is complete after the
+        current capacity over ALLOCATION_RATE slots worth, or moves the
+        live entries of the next count slots of the old table into the
+        current one and drops the old table once it is drained
+        """
+        if self._new_buckets is not None:
+            self._allocate_step(-(-count * ALLOCATION_RATE * self._new_capacity
+                                  // self._capacity))
+            return
+
+        old_buckets = self._old_buckets
+        end = min(self._migrate_index + count, old_buckets.length())
+        for i in range(self._migrate_index, end):
+            entry = old_buckets[i]
+            if entry is not None:
+                if entry.is_tombstone is False:
+                    self._place_entry(entry, self._bucket_index(entry.hash))
+                old_buckets[i] = _MOVED
+        self._migrate_index = end
+
+        if end == old_buckets.length():
+            self._old_buckets = None
+            self._migrating = False
+
+    def _allocate_step(self, slots: int) -> None:
+        """
+        adds up to slots empty slots to the new table of an incremental
+        resize. once it is complete the map switches to it and the
+        current table becomes the old one, to be drained
+        """
+        new_buckets = self._new_buckets
+        missing = self._new_capacity - new_buckets.length()
+        new_buckets.extend(repeat(None, min(slots, missing)))
+        if slots < missing:
+            return
+
+        self._new_buckets = None
+        self._old_buckets = self._buckets
+        self._migrate_index = 0
+        self._use_table(new_buckets)
+
+    def _finish_migration(self) -> None:
+        """
+        completes an incremental resize in one go, if one is running
+        """
+        if self._new_buckets is not None:
+            self._allocate_step(self._new_capacity)
+        if self._old_buckets is not None:
+            self._migrate(self._old_buckets.length())
+
+    def _reseed(self) -> None:
+        """
+        switches a hardened map to a fresh random hash key and rehashes
+        every entry, which breaks up any probe chain an attacker has built
+        """
+        self._finish_migration()
+        self._hash_function = make_keyed_hash()
+        self._reseed_count += 1
+        self._refresh_hashes()
+        self._rehash(self._capacity)
+
+    def _refresh_hashes(self) -> None:
+        """
+        recomputes the cached hash of every live entry
+        """
         for i in range(self._capacity):
-            self._buckets.append(None)
-        self._size = 0
+            entry = self._buckets[i]
+            if entry is not None and entry.is_tombstone is False:
+                entry.hash = self._hash_function(entry.key)
 
-        # copy the old values if they are not None and not a tombstone.
-        # tombstones are left behind
-        for i in range(old_capacity):
-            if temp[i] is not None and temp[i].is_tombstone is False:
-                self.put(temp[i].key, temp[i].value)
+    def _find_old_entry(self, key: str, hash: int) -> HashEntry:
+        """
+        returns the live entry for the key in the table being drained,
+        or None. removed entries are flagged as tombstones wherever they
+        are, so a plain probe up to the first empty slot is enough
+        """
+        buckets = self._old_buckets
+        capacity = buckets.length()
+        index = self._bucket_index(hash, capacity)
+        step = self._probe_step(key, hash, capacity)
+        delta = self._probe_delta
+
+        for _ in range(capacity):
+            entry = buckets[index]
+            if entry is None:
+                return None
+            if entry.is_tombstone is False and entry.hash == hash and entry.key == key:
+                return entry
+            index = (index + step) % capacity
+            step += delta
+        return None
 
-    def get(self, key: str) -> object:
+    def get(self, key: str, default: object = None) -> object:
         """
         returns the value associated with the given key
-        returns None if the key is not in the hashmap or is already a tombstone
+        returns default if the key is not in the hashmap or is already a tombstone
         """
+        if self._migrating:
+            self._migrate(self._rehash_step)
+
         hash = self._hash_function(key)
-        index = hash % self._capacity
-        initial_index = index
+        index, found = self._find_slot(key, hash)
+        if found:
+            return self._buckets[index].value
 
-        j = 1
-        while self._buckets[index] is not None:
-            if self._buckets[index].key == key:
-                if self._buckets[index].is_tombstone:
-                    return None
-                else:
-                    return self._buckets[index].value
-            else:
-                index = (initial_index + j ** 2) % self._capacity
-                j += 1
-        return None
+        if self._old_buckets is not None:
+            entry = self._find_old_entry(key, hash)
+            if entry is not None:
+                return entry.value
+        return default
 
     def contains_key(self, key: str) -> bool:
         """
@@ -200,41 +609,121 @@ class HashMap:
         """
         if self._size == 0:
             return False
+        if self._migrating:
+            self._migrate(self._rehash_step)
 
-        return True if self.get(key) is not None else False
+        hash = self._hash_function(key)
+        if self._find_slot(key, hash)[1]:
+            return True
+        if self._old_buckets is not None:
+            return self._find_old_entry(key, hash) is not None
+        return False
 
     def remove(self, key: str) -> None:
         """
-        sets the tombstone of a given key's hash entry to True to signify its deletion
+        sets the tombstone of a given key's hash entry to True to signify its deletion.
+        compacts the table in place once there are too many tombstones
         """
-        hash = self._hash_function(key)
-        index = hash % self._capacity
-        initial_index = index
-
-        if self.contains_key(key):
-            j = 1
-            while self._buckets[index].key != key:
-                index = (initial_index + j ** 2) % self._capacity
-                j += 1
+        if self._size == 0:
+            return
+        if self._migrating:
+            self._migrate(self._rehash_step)
 
+        hash = self._hash_function(key)
+        index, found = self._find_slot(key, hash)
+        if not found and self._old_buckets is not None:
+            entry = self._find_old_entry(key, hash)
+            if entry is not None:
+                # not migrated yet, the flag keeps it from moving over
+                entry.is_tombstone = True
+                self._size -= 1
+        elif found and self._robin_hood:
+            self._delete_robin_hood(index)
+            self._size -= 1
+        elif found:
             self._buckets[index].is_tombstone = True
             self._size -= 1
+            self._tombstones += 1
+
+            if self._tombstones > self._max_tombstone_ratio * self._capacity:
+                if not self._incremental:
+                    self.resize_table(self._capacity)
+                elif not self._migrating:
+                    # a resize under way leaves the tombstones behind anyway
+                    self._start_migration(self._capacity)
+
+    def _reserve(self, count: int) -> None:
+        """
+        grows the table once, so count entries can be put without the
+        load reaching 0.5 and triggering a resize along the way
+        """
+        capacity = self._capacity
+        while 2 * (count - 1) >= capacity:
+            capacity = self._table_size(2 * capacity)
+        if capacity == self._capacity:
+            return
+        if self._incremental:
+            self._start_migration(capacity)
+        else:
+            self.resize_table(capacity)
+
+    def put_many(self, pairs) -> None:
+        """
+        puts every (key, value) pair of pairs, a DynamicArray or any other
+        iterable. the table is sized once for the whole batch up front, as
+        if every key were new, so none of the puts has to resize.
+        big batches are hashed with NumPy when the hash function allows,
+        see bulk_hash
+        """
+        pairs = as_list(pairs)
+        self._reserve(self._size + len(pairs))
+
+        if (not self._migrating and bulk_hash.enabled(len(pairs))
+                and bulk_hash.vectorizes(self._hash_function)):
+            hashes = bulk_hash.hash_keys(self._hash_function, [pair[0] for pair in pairs])
+            put = self._put
+            for (key, value), hash in zip(pairs, hashes):
+                put(key, value, hash)
+            return
+
+        put = self.put
+        for key, value in pairs:
+            put(key, value)
+
+    def get_many(self, keys) -> list:
+        """
+        returns a list with the value of each key in keys (a DynamicArray
+        or any other iterable), None for the keys that are not in the map
+        """
+        get = self.get
+        return [get(key) for key in as_list(keys)]
+
+    def remove_many(self, keys) -> int:
+        """
+        removes every key in keys (a DynamicArray or any other iterable)
+        and returns how many of them were in the map
+        """
+        size = self._size
+        remove = self.remove
+        for key in as_list(keys):
+            remove(key)
+        return size - self._size
 
     def clear(self) -> None:
         """
         sets the hash map bucket array to a new array and sets all element to None
         """
-        self._buckets = DynamicArray()
-        i = 0
-        while i < self._capacity:
-            self._buckets.append(None)
-            i += 1
+        self._allocate(self._capacity)
         self._size = 0
+        self._migrating = False
+        self._new_buckets = None
+        self._old_buckets = None
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         returns all elements in a tuple (k,v) in a new array
         """
+        self._finish_migration()
         temp = DynamicArray()
 
         for i in range(self._capacity):
@@ -243,11 +732,506 @@ class HashMap:
 
         return temp
 
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        """
+        returns the number of keys in the map
+        """
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        """
+        returns True if the key is in the map, see contains_key
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        returns the value of the key, raises KeyError if it is not in the map
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map, see put
+        """
+        self.put(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        """
+        removes the key, raises KeyError if it is not in the map
+        """
+        size = self._size
+        self.remove(key)
+        if self._size == size:
+            raise KeyError(key)
+
+    def __iter__(self):
+        """
+        yields every key, read straight out of the table
+        """
+        self._finish_migration()
+        for entry in self._buckets:
+            if entry is not None and entry.is_tombstone is False:
+                yield entry.key
+
+    def _iter_items(self):
+        """
+        yields every (key, value) pair, read straight out of the table
+        """
+        self._finish_migration()
+        for entry in self._buckets:
+            if entry is not None and entry.is_tombstone is False:
+                yield entry.key, entry.value
+
+    def keys(self) -> KeysView:
+        """
+        returns a view of the keys that reads the table as it is iterated
+        """
+        return KeysView(self)
+
+    def values(self) -> HashMapValuesView:
+        """
+        returns a view of the values that reads the table as it is iterated
+        """
+        return HashMapValuesView(self)
+
+    def items(self) -> HashMapItemsView:
+        """
+        returns a view of the (key, value) pairs that reads the table as
+        it is iterated
+        """
+        return HashMapItemsView(self)
+
+    def iter_items(self, chunk_size: int = 1024):
+        """
+        yields the (key, value) pairs in lists of chunk_size (the last one
+        can be shorter), read straight out of the table, so a full scan
+        only ever holds one chunk
+        """
+        return chunked(self._iter_items(), chunk_size)
+
+    def dump(self, fileobj, chunk_size: int = 1024) -> int:
+        """
+        writes every entry to the text file object as a 'key: value' line,
+        one chunk of lines at a time, and returns how many were written
+        """
+        count = 0
+        for chunk in self.iter_items(chunk_size):
+            fileobj.write(''.join([f"{key}: {value}\n" for key, value in chunk]))
+            count += len(chunk)
+        return count
+
+    def save(self, path: str) -> None:
+        """
+        writes the map to a snapshot file, see hash_map_io. keys have to
+        be str, values are pickled
+        """
+        self._finish_migration()
+        hash_map_io.write_snapshot(path, self._capacity, self._layout(),
+                                   self._hash_function, self._size, self._records())
+
+    @classmethod
+    def load(cls, path: str, function=None, **options) -> "HashMap":
+        """
+        reads a map written by save. function defaults to the one it was
+        saved with if hash_map_io can recreate it, options go to the
+        constructor. when the new map hashes and lays out its table the
+        same way, every entry goes straight back into its saved slot with
+        its saved hash, otherwise the keys are put again
+        """
+        snapshot = hash_map_io.read_snapshot(path)
+        if function is None:
+            function = snapshot.function()
+        map = cls(snapshot.capacity, function, **options)
+
+        records = snapshot.records()
+        if snapshot.matches(map._hash_function, map._capacity, map._layout()):
+            map._restore(records)
+        else:
+            map.put_many((key, value) for _, _, key, value in records if key is not None)
+        return map
+
+    def _layout(self) -> str:
+        """
+        names how entries are placed in the table, for snapshots. None
+        when double hashing takes its step from a function_2 that can't
+        be identified
+        """
+        layout = f"oa:{self._probing}:" + ('power_of_two' if self._power_of_two else 'prime')
+        if self._double_hash and self._hash_function_2 is not None:
+            identity = hash_map_io.function_identity(self._hash_function_2)
+            if identity is None:
+                return None
+            layout += f":{identity[0]}:{identity[1]}"
+        return layout
+
+    def _records(self):
+        """
+        yields (slot, hash, key, value) for every entry, and a key of None
+        for every tombstone
+        """
+        for slot, entry in enumerate(self._buckets):
+            if entry is None:
+                continue
+            if entry.is_tombstone:
+                yield slot, None, None, None
+            else:
+                yield slot, entry.hash, entry.key, entry.value
+
+    def _restore(self, records) -> None:
+        """
+        puts saved entries, and tombstones where the key is None, straight
+        into their slots of the empty table
+        """
+        slots = [None] * self._capacity
+        for slot, hash, key, value in records:
+            entry = HashEntry(key, value, hash)
+            slots[slot] = entry
+            if key is None:
+                entry.is_tombstone = True
+                self._tombstones += 1
+            else:
+                self._size += 1
+        self._buckets = DynamicArray(slots)
+
+
+# slot states of the CompactHashMap
+EMPTY, LIVE, TOMBSTONE = 0, 1, 2
+
+# the CompactHashMap keeps hashes as unsigned 64 bit integers
+HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+class CompactHashMap(HashMap):
+    """
+    Open addressing HashMap with the same API and options as HashMap, but
+    stored as parallel arrays instead of one HashEntry per slot: keys and
+    values in plain lists, the hash of each key (cut to 64 bits) in an
+    unsigned array and a bytearray of slot states. a probe only reads the
+    state and the cached hash until the hashes match, and a slot costs two
+    list pointers, eight bytes of hash and a byte of state.
+    incremental resizing is not supported by this storage
+    """
+
+    def __init__(self, capacity: int, function, **options) -> None:
+        """
+        Initialize new CompactHashMap, see HashMap for the options
+        """
+        if options.get('incremental_resize'):
+            raise ValueError("CompactHashMap does not support incremental_resize")
+        super().__init__(capacity, function, **options)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide the same output as HashMap
+        """
+        out = []
+        for i in range(self._capacity):
+            if self._states[i] == EMPTY:
+                out.append(f"{i}: None\n")
+            else:
+                out.append(f"{i}: K: {self._keys[i]} V: {self._values[i]} "
+                           f"TS: {self._states[i] == TOMBSTONE}\n")
+        return ''.join(out)
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        points the map at new empty arrays of exactly capacity slots
+        """
+        self._capacity = capacity
+        self._mask = capacity - 1 if self._power_of_two else 0
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('Q', [0]) * capacity
+        self._states = bytearray(capacity)
+        self._tombstones = 0
+
+    def _find_slot(self, key: str, hash: int) -> (int, bool):
+        """
+        runs the probe sequence for the key exactly once, see HashMap._find_slot
+        """
+        if self._robin_hood:
+            return self._find_slot_robin_hood(key, hash)
+
+        capacity = self._capacity
+        states, hashes, keys = self._states, self._hashes, self._keys
+        index = self._bucket_index(hash)
+        step = self._probe_step(key, hash)
+        delta = self._probe_delta
+        tombstone_index = -1
+
+        for probes in range(1, capacity + 1):
+            state = states[index]
+            if state == EMPTY:
+                self._probe_count = probes
+                if tombstone_index != -1:
+                    return tombstone_index, False
+                return index, False
+            if state == TOMBSTONE:
+                if tombstone_index == -1:
+                    tombstone_index = index
+            elif hashes[index] == hash and keys[index] == key:
+                self._probe_count = probes
+                return index, True
+            index = (index + step) % capacity
+            step += delta
+        self._probe_count = capacity
+        return tombstone_index, False
+
+    def _probe_distance(self, index: int) -> int:
+        """
+        returns how far the entry at index sits from its home slot
+        """
+        return (index - self._bucket_index(self._hashes[index])) % self._capacity
+
+    def _find_slot_robin_hood(self, key: str, hash: int) -> (int, bool):
+        """
+        robin hood version of _find_slot, see HashMap._find_slot_robin_hood
+        """
+        capacity = self._capacity
+        states, hashes, keys = self._states, self._hashes, self._keys
+        index = self._bucket_index(hash)
+
+        for distance in range(capacity):
+            self._probe_count = distance + 1
+            if states[index] == EMPTY or self._probe_distance(index) < distance:
+                return index, False
+            if hashes[index] == hash and keys[index] == key:
+                return index, True
+            index = (index + 1) % capacity
+        return -1, False
+
+    def _insert_robin_hood(self, index: int, key: str, value: object, hash: int) -> None:
+        """
+        places the entry at index and shifts richer entries further down
+        """
+        capacity = self._capacity
+        states, hashes, keys, values = self._states, self._hashes, self._keys, self._values
+        distance = (index - self._bucket_index(hash)) % capacity
+
+        while states[index] == LIVE:
+            resident_distance = self._probe_distance(index)
+            if resident_distance < distance:
+                # take the slot from the richer entry and carry it on
+                keys[index], key = key, keys[index]
+                values[index], value = value, values[index]
+                hashes[index], hash = hash, hashes[index]
+                distance = resident_distance
+            index = (index + 1) % capacity
+            distance += 1
+        keys[index], values[index], hashes[index] = key, value, hash
+        states[index] = LIVE
+
+    def _delete_robin_hood(self, index: int) -> None:
+        """
+        removes the entry at index with a backward shift
+        """
+        capacity = self._capacity
+        states, hashes, keys, values = self._states, self._hashes, self._keys, self._values
+        following = (index + 1) % capacity
+        while states[following] == LIVE and self._probe_distance(following) > 0:
+            keys[index], values[index], hashes[index] = \
+                keys[following], values[following], hashes[following]
+            index, following = following, (following + 1) % capacity
+        keys[index] = values[index] = None
+        states[index] = EMPTY
+
+    def _rehash(self, capacity: int) -> None:
+        """
+        moves every live entry into new arrays of exactly capacity slots,
+        reusing the cached hashes
+        """
+        old_states, old_hashes = self._states, self._hashes
+        old_keys, old_values = self._keys, self._values
+        self._allocate(capacity)
+
+        if not bulk_hash.enabled(self._size):
+            # move the entries straight across, no list of them is built
+            for i in range(len(old_states)):
+                if old_states[i] == LIVE:
+                    hash = old_hashes[i]
+                    self._place(old_keys[i], old_values[i], hash, self._bucket_index(hash))
+            return
+
+        live = [i for i in range(len(old_states)) if old_states[i] == LIVE]
+        indices = bulk_hash.bucket_indices([old_hashes[i] for i in live],
+                                           self._capacity, self._mask)
+        for i, index in zip(live, indices):
+            self._place(old_keys[i], old_values[i], old_hashes[i], index)
+
+    def _place(self, key: str, value: object, hash: int, index: int) -> None:
+        """
+        puts an entry whose key is known to be absent into the first
+        free slot of its probe sequence, which starts at index
+        """
+        if self._robin_hood:
+            self._insert_robin_hood(index, key, value, hash)
+            return
+
+        capacity, states = self._capacity, self._states
+        step = self._probe_step(key, hash)
+        delta = self._probe_delta
+        while states[index] != EMPTY:
+            index = (index + step) % capacity
+            step += delta
+        self._keys[index], self._values[index], self._hashes[index] = key, value, hash
+        states[index] = LIVE
+
+    def put(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map, see HashMap.put
+        """
+        if self.table_load() >= .5:
+            self.resize_table(2 * self._capacity)
+
+        self._put(key, value, self._hash_function(key) & HASH_MASK)
+
+    def _put(self, key: str, value: object, hash: int) -> None:
+        """
+        puts the key with its 64 bit hash, see HashMap._put
+        """
+        index, found = self._find_slot(key, hash)
+        if found:
+            self._values[index] = value
+            return
+
+        if index == -1:
+            # the probe sequence ran out of slots, grow and try again
+            self.resize_table(2 * self._capacity)
+            self.put(key, value)
+            return
+
+        if self._robin_hood:
+            self._insert_robin_hood(index, key, value, hash)
+        else:
+            if self._states[index] == TOMBSTONE:
+                self._tombstones -= 1
+            self._keys[index], self._values[index], self._hashes[index] = key, value, hash
+            self._states[index] = LIVE
+        self._size += 1
+
+        if self._hardened and self._probe_count > self._max_probe:
+            self._reseed()
+
+    def _refresh_hashes(self) -> None:
+        """
+        recomputes the cached hash of every live entry
+        """
+        for i in range(self._capacity):
+            if self._states[i] == LIVE:
+                self._hashes[i] = self._hash_function(self._keys[i]) & HASH_MASK
+
+    def empty_buckets(self) -> int:
+        """
+        counts the empty buckets and tombstones
+        """
+        return self._capacity - self._size
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        returns the value associated with the given key, or default
+        """
+        index, found = self._find_slot(key, self._hash_function(key) & HASH_MASK)
+        if found:
+            return self._values[index]
+        return default
+
+    def contains_key(self, key: str) -> bool:
+        """
+        returns True if the key is in the hash map or False otherwise
+        """
+        if self._size == 0:
+            return False
+        return self._find_slot(key, self._hash_function(key) & HASH_MASK)[1]
+
+    def remove(self, key: str) -> None:
+        """
+        removes the key from the map, see HashMap.remove
+        """
+        if self._size == 0:
+            return
+
+        index, found = self._find_slot(key, self._hash_function(key) & HASH_MASK)
+        if not found:
+            return
+        self._size -= 1
+        if self._robin_hood:
+            self._delete_robin_hood(index)
+            return
+
+        self._states[index] = TOMBSTONE
+        self._keys[index] = self._values[index] = None
+        self._tombstones += 1
+        if self._tombstones > self._max_tombstone_ratio * self._capacity:
+            self.resize_table(self._capacity)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        returns all elements in a tuple (k,v) in a new array
+        """
+        temp = DynamicArray()
+        for i in range(self._capacity):
+            if self._states[i] == LIVE:
+                temp.append((self._keys[i], self._values[i]))
+        return temp
+
+    def __iter__(self):
+        """
+        yields every key, read straight out of the arrays
+        """
+        for key, state in zip(self._keys, self._states):
+            if state == LIVE:
+                yield key
+
+    def _iter_items(self):
+        """
+        yields every (key, value) pair, read straight out of the arrays
+        """
+        for key, value, state in zip(self._keys, self._values, self._states):
+            if state == LIVE:
+                yield key, value
+
+    def _records(self):
+        """
+        yields (slot, hash, key, value) for every entry, and a key of None
+        for every tombstone
+        """
+        for slot in range(self._capacity):
+            state = self._states[slot]
+            if state == LIVE:
+                yield slot, self._hashes[slot], self._keys[slot], self._values[slot]
+            elif state == TOMBSTONE:
+                yield slot, None, None, None
+
+    def _restore(self, records) -> None:
+        """
+        puts saved entries, and tombstones where the key is None, straight
+        into their slots of the empty arrays
+        """
+        keys, values, hashes, states = self._keys, self._values, self._hashes, self._states
+        for slot, hash, key, value in records:
+            if key is None:
+                states[slot] = TOMBSTONE
+                self._tombstones += 1
+            else:
+                keys[slot], values[slot], hashes[slot] = key, value, hash
+                states[slot] = LIVE
+                self._size += 1
+
 
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 if __name__ == "__main__":
 
+    import io
+    import os
+    import tempfile
+
     print("\nPDF - put example 1")
     print("-------------------")
     m = HashMap(53, hash_function_1)
@@ -432,3 +1416,120 @@ if __name__ == "__main__":
     m.remove('1')
     m.resize_table(12)
     print(m.get_keys_and_values())
+
+    print("\ntombstone reuse example")
+    print("-----------------------")
+    # the three keys have the same hash, so they share a probe sequence
+    m = HashMap(11, hash_function_1, probing='linear')
+    m.put('abc', 1)
+    m.put('bca', 2)
+    m.remove('abc')
+    m.put('cab', 3)
+    print(m)
+    print(m.get('bca'), m.get('cab'), m.contains_key('abc'))
+
+    print("\ntombstone compaction example")
+    print("----------------------------")
+    m = HashMap(53, hash_function_1, probing='linear', max_tombstone_ratio=0.25)
+    for i in range(20):
+        m.put('key' + str(i), i)
+    for i in range(13):
+        m.remove('key' + str(i))
+    print(m.get_size(), str(m).count('TS: True'))
+    m.remove('key13')
+    print(m.get_size(), str(m).count('TS: True'), m.get_capacity())
+    print(all(m.get('key' + str(i)) == i for i in range(14, 20)))
+
+    print("\nNone value example")
+    print("------------------")
+    # a key stored with None is still in the map
+    m = HashMap(11, hash_function_1)
+    m.put('none', None)
+    print(m.contains_key('none'), m.get('none', 'missing'), m.get_size())
+    m.remove('none')
+    print(m.contains_key('none'), m.get('none', 'missing'), m.get_size())
+
+    print("\nprobing strategies example")
+    print("--------------------------")
+    for storage in (HashMap, CompactHashMap):
+        for policy in ('prime', 'power_of_two'):
+            for probing in ('linear', 'quadratic', 'triangular', 'double', 'robin_hood'):
+                m = storage(53, hash_function_1, probing=probing,
+                            function_2=hash_function_2, capacity_policy=policy)
+                for i in range(150):
+                    m.put('key' + str(i), i * 100)
+                for i in range(0, 150, 2):
+                    m.remove('key' + str(i))
+                result = True
+                for i in range(150):
+                    result &= m.contains_key('key' + str(i)) == (i % 2 == 1)
+                print(storage.__name__, policy, probing, result,
+                      m.get_size(), m.get_capacity(), m.empty_buckets())
+
+    print("\nincremental resize example")
+    print("--------------------------")
+    m = HashMap(11, hash_function_1, incremental_resize=True, rehash_step=4)
+    for i in range(200):
+        m.put('key' + str(i), i)
+    result = True
+    for i in range(200):
+        result &= m.get('key' + str(i)) == i
+    print(result, m.get_size(), m.get_capacity())
+
+    print("\nhardened example")
+    print("----------------")
+    keys = ['abcdef'[i:] + 'abcdef'[:i] for i in range(6)]
+    keys += [key[::-1] for key in keys]
+    m = HashMap(11, hash_function_1, hardened=True, max_probe=8)
+    for key in keys:
+        m.put(key, key)
+    print(m.get_size(), all(m.get(key) == key for key in keys))
+
+    print("\nbatch example")
+    print("-------------")
+    m = HashMap(11, hash_function_1)
+    m.put_many(('key' + str(i), i) for i in range(100))
+    print(m.get_size(), m.get_capacity())
+    print(m.get_many(['key1', 'key50', 'missing']))
+    print(m.remove_many(DynamicArray(['key1', 'key2', 'missing'])), m.get_size())
+
+    print("\nbuilt-in hash rebuild example")
+    print("-----------------------------")
+    # hash gives negative values for about half the keys, and the tables
+    # these rebuild into are large enough for the bulk bucket path
+    m = HashMap(11, hash)
+    for i in range(5000):
+        m.put('key' + str(i), i)
+    result = all(m.get('key' + str(i)) == i for i in range(5000))
+    print(result, m.get_size(), m.get_capacity())
+    print(m.remove_many('key' + str(i) for i in range(5000)), m.get_size())
+
+    print("\nmapping protocol example")
+    print("------------------------")
+    m = HashMap(11, hash_function_1)
+    m['one'] = 1
+    m['two'] = 2
+    del m['one']
+    print(len(m), 'one' in m, m['two'], list(m.items()))
+    try:
+        m['one']
+    except KeyError as error:
+        print('KeyError', error)
+
+    print("\nstreaming example")
+    print("-----------------")
+    m = HashMap(11, hash_function_1)
+    m.put_many(('key' + str(i), i) for i in range(10))
+    print([len(chunk) for chunk in m.iter_items(4)])
+    out = io.StringIO()
+    print(m.dump(out), out.getvalue().count('\n'))
+
+    print("\nsnapshot example")
+    print("----------------")
+    m = HashMap(11, hash_function_1)
+    m.put_many(('key' + str(i), [i]) for i in range(20))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.bin')
+        m.save(path)
+        loaded = HashMap.load(path)
+    print(loaded.get_size(), loaded.get_capacity(), loaded['key7'], str(loaded) == str(m))
@@ -0,0 +1,236 @@
+# Course: CS261 - Data Structures
+# Description: approximate most frequent values of a stream in fixed memory,
+#              for streams with too many distinct values to give each one
+#              an entry the way find_mode does. SpaceSaving keeps a fixed
+#              number of counters in a min heap, indexed by a separate
+#              chaining HashMap, and answers top_k and mode with error
+#              bounds that follow from the number of counters.
+
+
+import heapq
+import math
+from operator import attrgetter
+
+from a6_include import DynamicArray, hash_function_fnv1a
+from hash_map_sc import HashMap
+
+
+class Counter:
+    """
+    one counter of SpaceSaving: the value it monitors, its count, the
+    most that count can overstate the value's frequency, and its position
+    in the heap
+    """
+
+    __slots__ = ('value', 'count', 'error', 'index')
+
+    def __init__(self, value: str, count: int, error: int, index: int) -> None:
+        self.value = value
+        self.count = count
+        self.error = error
+        self.index = index
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return f"({self.value}: {self.count} +- {self.error})"
+
+
+class SpaceSaving:
+    """
+    the Space-Saving summary of Metwally, Agrawal and El Abbadi. a value
+    that is monitored has its counter incremented; a new value takes over
+    the counter with the lowest count, keeping that count as its error,
+    so counts never understate a frequency and overstate it by at most
+    the error.
+
+    with m counters after n values every error is at most n / m, and any
+    value seen more than n / m times is monitored. memory is m counters
+    and a map of m keys however many distinct values the stream has
+    """
+
+    def __init__(self,
+                 counters: int = None,
+                 epsilon: float = None,
+                 function: callable = hash_function_fnv1a) -> None:
+        """
+        Initialize new SpaceSaving with the given number of counters, or
+        with ceil(1 / epsilon) of them to bound every error by epsilon
+        times the number of values counted. the counters are indexed by
+        a separate chaining HashMap that hashes with function
+        """
+        if (counters is None) == (epsilon is None):
+            raise ValueError("give one of counters and epsilon")
+        if epsilon is not None:
+            if not 0 < epsilon < 1:
+                raise ValueError("epsilon must be between 0 and 1")
+            counters = math.ceil(1 / epsilon)
+        if counters < 1:
+            raise ValueError("counters must be at least 1")
+
+        self._capacity = counters
+        # sized for every counter up front and never resized
+        self._index = HashMap(counters, function)
+        self._heap = []
+        self._total = 0
+
+    def _sift_down(self, index: int) -> None:
+        """
+        moves the counter at index down the heap until no child has a
+        lower count
+        """
+        heap = self._heap
+        size = len(heap)
+        counter = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1].count < heap[child].count:
+                child += 1
+            if heap[child].count >= counter.count:
+                break
+            heap[index] = heap[child]
+            heap[index].index = index
+            index = child
+        heap[index] = counter
+        counter.index = index
+
+    def add(self, value: str, count: int = 1) -> None:
+        """
+        counts value count more times
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        self._total += count
+        heap = self._heap
+
+        counter = self._index.get(value)
+        if counter is not None:
+            counter.count += count
+            self._sift_down(counter.index)
+        elif len(heap) < self._capacity:
+            # a free counter goes at the end of the heap and moves up
+            counter = Counter(value, count, 0, len(heap))
+            heap.append(counter)
+            self._index.put(value, counter)
+            index = counter.index
+            while index:
+                parent = (index - 1) // 2
+                if heap[parent].count <= counter.count:
+                    break
+                heap[index] = heap[parent]
+                heap[index].index = index
+                index = parent
+            heap[index] = counter
+            counter.index = index
+        else:
+            # the least counted value gives up its counter
+            counter = heap[0]
+            self._index.remove(counter.value)
+            counter.value = value
+            counter.error = counter.count
+            counter.count += count
+            self._index.put(value, counter)
+            self._sift_down(0)
+
+    def update(self, values) -> None:
+        """
+        counts every value of values, a DynamicArray or any other iterable
+        """
+        add = self.add
+        for value in values:
+            add(value)
+
+    def estimate(self, value: str) -> (int, int):
+        """
+        returns (count, error) for value: its frequency is at least
+        count - error and at most count. a value without a counter was
+        seen at most as often as the lowest count, returned as (0, 0) when
+        there are free counters and (lowest count, lowest count) when not
+        """
+        counter = self._index.get(value)
+        if counter is not None:
+            return counter.count, counter.error
+        if len(self._heap) < self._capacity:
+            return 0, 0
+        lowest = self._heap[0].count
+        return lowest, lowest
+
+    def top_k(self, k: int) -> DynamicArray:
+        """
+        returns the k values with the highest counts as (value, count,
+        error) tuples, highest first. a value whose count - error is at
+        least the count of the value after the k-th is certain to be in
+        the true top k
+        """
+        return DynamicArray([(counter.value, counter.count, counter.error)
+                             for counter in heapq.nlargest(k, self._heap,
+                                                           key=attrgetter('count'))])
+
+    def mode(self) -> (DynamicArray, int):
+        """
+        returns the array of values with the highest count and that count,
+        like hash_map_sc.find_mode. the count overstates the true frequency
+        by at most the error of each value, see top_k
+        """
+        modes = DynamicArray()
+        if not self._heap:
+            return modes, 0
+        highest = max(counter.count for counter in self._heap)
+        for counter in self._heap:
+            if counter.count == highest:
+                modes.append(counter.value)
+        return modes, highest
+
+    def get_total(self) -> int:
+        """
+        Return the number of values counted
+        """
+        return self._total
+
+    def get_capacity(self) -> int:
+        """
+        Return the number of counters
+        """
+        return self._capacity
+
+    def max_error(self) -> float:
+        """
+        Return the bound on every error, the number of values counted
+        divided by the number of counters
+        """
+        return self._total / self._capacity
+
+    def __len__(self) -> int:
+        """
+        returns the number of counters in use
+        """
+        return len(self._heap)
+
+
+if __name__ == "__main__":
+
+    print("\nspace saving example")
+    print("--------------------")
+    # value v appears about 1000 / (v + 1) times, in a fixed interleaved order
+    values = [str(v) for v in range(200) for _ in range(1000 // (v + 1))]
+    values = values[::2] + values[1::2]
+    exact = {}
+    for value in values:
+        exact[value] = exact.get(value, 0) + 1
+
+    summary = SpaceSaving(counters=20)
+    summary.update(values)
+    bound = summary.max_error()
+    print(summary.get_total(), len(summary), summary.get_capacity(), bound)
+
+    # every count overstates by at most its error, and every error is at
+    # most total / counters
+    top = summary.top_k(len(summary))
+    print(all(count - error <= exact[value] <= count and error <= bound
+              for value, count, error in top))
+    # every value seen more than total / counters times has a counter
+    monitored = {value for value, _, _ in top}
+    print(all(value in monitored for value, count in exact.items() if count > bound))
+    modes, frequency = summary.mode()
+    print(modes, frequency, summary.estimate('0'), exact['0'])
@@ -0,0 +1,185 @@
+# Course: CS261 - Data Structures
+# Description: frequency counting for find_mode over inputs too big to hold
+#              in a DynamicArray. ModeCounter counts a stream one value at
+#              a time with a single probe per value and can report the mode
+#              at any point. parallel_mode counts chunks of the input in
+#              worker processes and merges their counts into one counter.
+
+
+import multiprocessing
+import os
+from collections import deque
+
+import hash_map_io
+from a6_include import DynamicArray, chunked, hash_function_fnv1a
+from hash_map_sc import HashMap
+
+
+# values a worker of parallel_mode counts per task
+CHUNK_SIZE = 1 << 16
+
+
+class ModeCounter:
+    """
+    counts of the values seen so far, kept in a separate chaining HashMap
+    with a value's count as its value. the highest count and the values
+    that have it are kept up to date as counts go up, since counts never
+    go down, so mode() costs nothing however much has been counted
+    """
+
+    def __init__(self, function: callable = hash_function_fnv1a, **options) -> None:
+        """
+        Initialize new ModeCounter. the counts map hashes with function
+        and takes the options of hash_map_sc.HashMap; max_load defaults
+        to 1.0 so it grows with the number of distinct values
+        """
+        options.setdefault('max_load', 1.0)
+        self._counts = HashMap(11, function, **options)
+        self._total = 0
+        self._max_frequency = 0
+        self._modes = []
+
+    def add(self, value: str, count: int = 1) -> int:
+        """
+        counts value count more times and returns its count
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        frequency = self._counts.increment(value, count)
+        self._total += count
+        if frequency > self._max_frequency:
+            self._max_frequency = frequency
+            self._modes = [value]
+        elif frequency == self._max_frequency:
+            self._modes.append(value)
+        return frequency
+
+    def update(self, values) -> None:
+        """
+        counts every value of values, a DynamicArray or any other
+        iterable, which is read once and never held in memory
+        """
+        increment = self._counts.increment
+        max_frequency, modes = self._max_frequency, self._modes
+        total = 0
+        for value in values:
+            frequency = increment(value)
+            total += 1
+            if frequency > max_frequency:
+                max_frequency = frequency
+                modes = [value]
+            elif frequency == max_frequency:
+                modes.append(value)
+        self._total += total
+        self._max_frequency, self._modes = max_frequency, modes
+
+    def merge(self, counts) -> None:
+        """
+        adds the counts of another ModeCounter, or of any iterable of
+        (value, count) pairs, to this one
+        """
+        if isinstance(counts, ModeCounter):
+            counts = counts.items()
+        for value, count in counts:
+            self.add(value, count)
+
+    def mode(self) -> (DynamicArray, int):
+        """
+        returns the array of most common value(s) so far and their
+        frequency, like hash_map_sc.find_mode. the frequency is 0 before
+        anything has been counted
+        """
+        return DynamicArray(self._modes), self._max_frequency
+
+    def count(self, value: str) -> int:
+        """
+        returns how many times value has been counted
+        """
+        return self._counts.get(value, 0)
+
+    def get_total(self) -> int:
+        """
+        Return the number of values counted
+        """
+        return self._total
+
+    def get_size(self) -> int:
+        """
+        Return the number of distinct values counted
+        """
+        return self._counts.get_size()
+
+    def __len__(self) -> int:
+        """
+        returns the number of distinct values counted
+        """
+        return self._counts.get_size()
+
+    def items(self):
+        """
+        returns a view of the (value, count) pairs
+        """
+        return self._counts.items()
+
+
+def _count_chunk(values: list, function) -> list:
+    """
+    body of a parallel_mode task, returns the (value, count) pairs of one
+    chunk of the input
+    """
+    counter = ModeCounter(hash_map_io.resolve_function(function))
+    counter.update(values)
+    return list(counter.items())
+
+
+def parallel_mode(values, processes: int = None, chunk_size: int = CHUNK_SIZE,
+                  function: callable = hash_function_fnv1a,
+                  context: str = None) -> ModeCounter:
+    """
+    counts values (a DynamicArray or any other iterable) in processes
+    worker processes, os.cpu_count() by default, and returns the merged
+    ModeCounter. the input is read chunk_size values at a time and at most
+    two chunks per worker are in flight, so an unbounded iterator is never
+    held in memory; the parent only holds the merged counts. values have
+    to be picklable and function the same in every process, see
+    hash_map_io.function_identity
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes < 1:
+        raise ValueError("processes must be at least 1")
+
+    counter = ModeCounter(function)
+    portable = hash_map_io.portable_function(function)
+    pending = deque()
+    with multiprocessing.get_context(context).Pool(processes) as pool:
+        for chunk in chunked(values, chunk_size):
+            pending.append(pool.apply_async(_count_chunk, (chunk, portable)))
+            if len(pending) >= 2 * processes:
+                counter.merge(pending.popleft().get())
+        while pending:
+            counter.merge(pending.popleft().get())
+    return counter
+
+
+if __name__ == "__main__":
+
+    from hash_map_sc import find_mode
+
+    print("\nmode counter example")
+    print("--------------------")
+    values = [str(i * i % 37) for i in range(2000)]
+    modes, frequency = find_mode(DynamicArray(values))
+
+    counter = ModeCounter()
+    counter.update(values)
+    counted_modes, counted_frequency = counter.mode()
+    print(sorted(counted_modes) == sorted(modes), counted_frequency == frequency,
+          counter.get_total(), counter.get_size())
+
+    print("\nparallel mode example")
+    print("---------------------")
+    # small chunks, so the values are spread over several tasks
+    counter = parallel_mode(values, processes=2, chunk_size=300)
+    parallel_modes, parallel_frequency = counter.mode()
+    print(sorted(parallel_modes) == sorted(modes), parallel_frequency == frequency,
+          counter.get_total(), counter.get_size(), frequency)
@@ -0,0 +1,320 @@
+# Course: CS261 - Data Structures
+# Description: hash map split over worker processes. every key is routed to
+#              one shard, a process holding an ordinary chaining or open
+#              addressing HashMap of its own, so the shards run on separate
+#              cores instead of sharing one interpreter lock. batches are
+#              grouped by shard and sent to all the shards before any reply
+#              is read, one round trip per shard for the whole batch.
+
+
+import multiprocessing
+
+import bulk_hash
+import hash_map_io
+from a6_include import as_list, mix_hash, hash_function_fnv1a
+from hash_map_oa import CompactHashMap, HashMap as OAHashMap
+from hash_map_sc import HashMap as SCHashMap
+
+
+# map classes a shard can hold, by the name ShardedHashMap takes
+MAP_TYPES = {
+    'sc': SCHashMap,
+    'oa': OAHashMap,
+    'oa-compact': CompactHashMap,
+}
+
+# methods of the shard's map the parent may call
+_OPERATIONS = frozenset((
+    'put', 'get', 'remove', 'contains_key', 'put_many', 'get_many',
+    'remove_many', 'get_size', 'get_capacity', 'clear', '__getitem__',
+))
+
+
+def _serve(connection, map_type: str, capacity: int, function, options: dict) -> None:
+    """
+    body of a shard process. builds the map, then runs the (operation,
+    arguments) requests arriving on connection and sends back ('ok',
+    result) or ('error', exception) for each, until it gets None
+    """
+    m = MAP_TYPES[map_type](capacity, hash_map_io.resolve_function(function), **options)
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        operation, arguments = request
+        try:
+            if operation not in _OPERATIONS:
+                raise ValueError(f"unknown operation: {operation!r}")
+            result = getattr(m, operation)(*arguments)
+        except Exception as error:
+            connection.send(('error', error))
+        else:
+            connection.send(('ok', result))
+    connection.close()
+
+
+class ShardedHashMap:
+    """
+    hash map spread over shards worker processes. the parent hashes each
+    key once to pick its shard, mix_hash(function(key)) % shards; the
+    mixing keeps the shard from deciding the key's bucket inside it.
+
+    keys and values travel between processes pickled, so they have to be
+    picklable, and the function has to give the same hashes in every
+    process (see hash_map_io.function_identity), which rules out the
+    built in hash under the spawn start method. one ShardedHashMap is not
+    safe to use from several threads at once. close it, or use it in a
+    with block, to stop the workers
+    """
+
+    def __init__(self,
+                 shards: int = 4,
+                 map_type: str = 'sc',
+                 capacity: int = 11,
+                 function: callable = hash_function_fnv1a,
+                 context: str = None,
+                 **options) -> None:
+        """
+        Initialize new ShardedHashMap and start its worker processes.
+        map_type is 'sc', 'oa' or 'oa-compact' and every shard gets a map
+        of it with the given function, a share of capacity and the options.
+        context names the multiprocessing start method, the platform's
+        default when None
+        """
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        if map_type not in MAP_TYPES:
+            raise ValueError(f"unknown map_type: {map_type!r}")
+
+        ctx = multiprocessing.get_context(context)
+        per_shard = max(1, -(-capacity // shards))
+        self._hash_function = function
+        self._connections = []
+        self._processes = []
+        for _ in range(shards):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_serve, daemon=True,
+                                  args=(child, map_type, per_shard,
+                                        hash_map_io.portable_function(function), options))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def close(self) -> None:
+        """
+        stops the worker processes. the map can't be used afterwards
+        """
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> "ShardedHashMap":
+        """
+        returns the map, which is closed at the end of the with block
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        closes the map
+        """
+        self.close()
+
+    def _shard(self, key: str) -> int:
+        """
+        returns the index of the shard that holds the key
+        """
+        return mix_hash(self._hash_function(key)) % len(self._connections)
+
+    def _call(self, shard: int, operation: str, *arguments) -> object:
+        """
+        runs one operation on one shard and returns its result
+        """
+        connection = self._connections[shard]
+        connection.send((operation, arguments))
+        return self._reply(connection)
+
+    @staticmethod
+    def _reply(connection) -> object:
+        """
+        reads a shard's reply, raising the exception it sent if it failed
+        """
+        status, result = connection.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def _broadcast(self, requests: dict) -> dict:
+        """
+        sends {shard: (operation, arguments)} to every shard first, then
+        collects the replies, so the shards work on them at the same time.
+        returns {shard: result}
+        """
+        for shard, request in requests.items():
+            self._connections[shard].send(request)
+        results, error = {}, None
+        for shard in requests:
+            # every reply is read, even after a failure, so none is left
+            # waiting in a pipe for the next call to pick up
+            try:
+                results[shard] = self._reply(self._connections[shard])
+            except Exception as exception:
+                error = error or exception
+        if error is not None:
+            raise error
+        return results
+
+    def _group(self, keys: list) -> list:
+        """
+        returns, per shard, the positions of the keys that belong to it.
+        the keys are hashed as one batch, see bulk_hash.hash_keys
+        """
+        shards = len(self._connections)
+        groups = [[] for _ in range(shards)]
+        for position, hash in enumerate(bulk_hash.hash_keys(self._hash_function, keys)):
+            groups[mix_hash(hash) % shards].append(position)
+        return groups
+
+    def put(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map of its shard
+        """
+        self._call(self._shard(key), 'put', key, value)
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        returns the value associated with the given key, or default
+        """
+        return self._call(self._shard(key), 'get', key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        returns True if the key is in the hash map or False otherwise
+        """
+        return self._call(self._shard(key), 'contains_key', key)
+
+    def remove(self, key: str) -> None:
+        """
+        removes the key from the map of its shard
+        """
+        self._call(self._shard(key), 'remove', key)
+
+    def put_many(self, pairs) -> None:
+        """
+        puts every (key, value) pair of pairs, a DynamicArray or any other
+        iterable, with one put_many per shard
+        """
+        pairs = as_list(pairs)
+        groups = self._group([pair[0] for pair in pairs])
+        self._broadcast({shard: ('put_many', ([pairs[position] for position in positions],))
+                         for shard, positions in enumerate(groups) if positions})
+
+    def get_many(self, keys) -> list:
+        """
+        returns a list with the value of each key in keys (a DynamicArray
+        or any other iterable), None for the keys that are not in the map
+        """
+        keys = as_list(keys)
+        groups = self._group(keys)
+        results = self._broadcast({shard: ('get_many', ([keys[position] for position in positions],))
+                                   for shard, positions in enumerate(groups) if positions})
+        values = [None] * len(keys)
+        for shard, shard_values in results.items():
+            for position, value in zip(groups[shard], shard_values):
+                values[position] = value
+        return values
+
+    def remove_many(self, keys) -> int:
+        """
+        removes every key in keys (a DynamicArray or any other iterable)
+        and returns how many of them were in the map
+        """
+        keys = as_list(keys)
+        groups = self._group(keys)
+        results = self._broadcast({shard: ('remove_many', ([keys[position] for position in positions],))
+                                   for shard, positions in enumerate(groups) if positions})
+        return sum(results.values())
+
+    def _all(self, operation: str) -> list:
+        """
+        runs an operation without arguments on every shard, returns the
+        results in shard order
+        """
+        results = self._broadcast({shard: (operation, ())
+                                   for shard in range(len(self._connections))})
+        return [results[shard] for shard in range(len(self._connections))]
+
+    def get_size(self) -> int:
+        """
+        Return size of map, summed over the shards
+        """
+        return sum(self._all('get_size'))
+
+    def get_capacity(self) -> int:
+        """
+        Return the total capacity of the shards
+        """
+        return sum(self._all('get_capacity'))
+
+    def get_shard_count(self) -> int:
+        """
+        Return the number of shards
+        """
+        return len(self._connections)
+
+    def clear(self) -> None:
+        """
+        empties every shard
+        """
+        self._all('clear')
+
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        """
+        returns the number of keys in the map
+        """
+        return self.get_size()
+
+    def __contains__(self, key: str) -> bool:
+        """
+        returns True if the key is in the map, see contains_key
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        returns the value of the key, raises KeyError if it is not in the map
+        """
+        return self._call(self._shard(key), '__getitem__', key)
+
+    def __setitem__(self, key: str, value: object) -> None:
+        """
+        puts the key and value into the map, see put
+        """
+        self.put(key, value)
+
+
+if __name__ == "__main__":
+
+    print("\nsharded map example")
+    print("-------------------")
+    # spawn starts every worker in a fresh interpreter that imports this
+    # module, which the __main__ guard keeps from running the example again
+    expected = {'key' + str(i): i for i in range(1000)}
+    with ShardedHashMap(4, 'sc', context='spawn') as m:
+        m.put_many(expected.items())
+        m.put('extra', -1)
+        m.remove('extra')
+        print(len(m), m.get_shard_count(), m.get('key7'), m.get('extra'))
+        print(m.get_many(list(expected)) == list(expected.values()))
+        print(m.remove_many(['key1', 'key2', 'missing']), m.contains_key('key1'), len(m))